@@ -12,5 +12,14 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'PharmacySchedule.settings')
+# połączenia trwałe są przypisane do wątków, a widoki synchroniczne pod ASGI nie mają stałego wątku -
+# ponowne użycie połączeń zapewnia tu pula (DATABASE_POOL=1)
+os.environ.setdefault('DATABASE_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
+
+from PharmacySchedule.dbpool import release_connections  # noqa: E402
+from schedule.startup import warm_up  # noqa: E402
+
+warm_up()
+release_connections()
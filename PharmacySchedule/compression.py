@@ -0,0 +1,109 @@
+"""
+Kompresja odpowiedzi tekstowych (HTML, JSON, CSV, iCalendar) w locie.
+
+Odpowiedzi mniejsze niż COMPRESSION_MIN_SIZE bajtów nie są kompresowane. Metoda wybierana jest na podstawie
+nagłówka Accept-Encoding: brotli (jeśli zainstalowano pakiet Brotli), w przeciwnym razie gzip. HTML
+kompresowany jest wyłącznie gzipem z losowym dopełnieniem (ochrona przed atakiem BREACH). Odpowiedzi
+strumieniowe (eksporty) kompresowane są kawałkami, więc nadal są wysyłane w trakcie generowania.
+
+Pliki statyczne obsługuje WhiteNoise - są kompresowane już przy collectstatic i nie przechodzą przez ten
+middleware.
+"""
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence, compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('text/html', 'application/json', 'text/csv', 'text/calendar', 'text/plain')
+
+# HTML zawiera token CSRF obok danych z żądania - tylko gzip z losowym dopełnieniem (BREACH)
+BROTLI_EXCLUDED_TYPES = ('text/html',)
+
+BROTLI_FLUSH_SIZE = 64 * 1024
+
+
+def accepted_encodings(request):
+    """
+    Zbiór metod kompresji z nagłówka Accept-Encoding (z pominięciem wyłączonych przez q=0).
+    """
+    encodings = set()
+    for item in request.headers.get('Accept-Encoding', '').split(','):
+        name, _, params = item.partition(';')
+        q = params.strip().removeprefix('q=')
+        if q and q.replace('.', '').strip('0') == '':
+            continue
+        encodings.add(name.strip().lower())
+    return encodings
+
+
+def _brotli_sequence(sequence, quality, flush_size=BROTLI_FLUSH_SIZE):
+    """
+    Kompresja kolejnych kawałków jednym strumieniem brotli. Wyjście opróżniane jest co flush_size bajtów
+    wejścia (każde flush() pogarsza stopień kompresji), tak aby duże eksporty nadal docierały w trakcie
+    generowania.
+    """
+    compressor = brotli.Compressor(quality=quality)
+    pending = 0
+    for item in sequence:
+        data = compressor.process(item)
+        pending += len(item)
+        if pending >= flush_size:
+            data += compressor.flush()
+            pending = 0
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_size = getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+        self.brotli_quality = getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 5)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        content_type = response.get('Content-Type', '').split(';')[0].strip()
+        if content_type not in COMPRESSIBLE_TYPES or response.has_header('Content-Encoding'):
+            return response
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encodings = accepted_encodings(request)
+        if brotli is not None and 'br' in encodings and content_type not in BROTLI_EXCLUDED_TYPES:
+            encoding = 'br'
+        elif 'gzip' in encodings:
+            encoding = 'gzip'
+        else:
+            return response
+
+        if response.streaming:
+            if encoding == 'br':
+                response.streaming_content = _brotli_sequence(response.streaming_content, self.brotli_quality)
+            else:
+                response.streaming_content = compress_sequence(response.streaming_content, max_random_bytes=100)
+            del response['Content-Length']
+        else:
+            if encoding == 'br':
+                compressed = brotli.compress(response.content, quality=self.brotli_quality)
+            else:
+                compressed = compress_string(response.content, max_random_bytes=100)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        # skompresowana treść nie jest identyczna bajt w bajt - silny ETag zamieniany jest na słaby
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+
+        response['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,103 @@
+"""
+Połączenia z bazą danych - metryki ponownego użycia połączeń i puli.
+
+Tryb połączeń ustawiany jest w settings.py: połączenia trwałe (CONN_MAX_AGE, CONN_HEALTH_CHECKS) albo pula
+psycopg 3 (DATABASE_POOL=1). connection_metrics() zwraca dla każdej bazy liczbę otwartych połączeń
+i obsłużonych żądań bieżącego procesu, a dla puli także jej zajętość oraz czas oczekiwania na połączenie.
+Metryki dotyczą jednego procesu roboczego.
+"""
+from contextlib import contextmanager
+from django.core.signals import request_finished
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+import os
+import threading
+
+_lock = threading.Lock()
+_opened = {}
+_requests = 0
+
+
+def _connection_created(sender, connection, **kwargs):
+    with _lock:
+        _opened[connection.alias] = _opened.get(connection.alias, 0) + 1
+
+
+def _request_finished(sender, **kwargs):
+    global _requests
+    with _lock:
+        _requests += 1
+
+
+connection_created.connect(_connection_created, dispatch_uid='dbpool_connection_created')
+request_finished.connect(_request_finished, dispatch_uid='dbpool_request_finished')
+
+
+def _pool(alias):
+    return getattr(connections[alias], 'pool', None)
+
+
+def connection_metrics():
+    metrics = {'pid': os.getpid(), 'requests': _requests, 'databases': {}}
+    for alias in connections:
+        settings_dict = connections.settings[alias]
+        pool = _pool(alias)
+        database = {
+            'mode': 'pool' if pool is not None else 'persistent' if settings_dict['CONN_MAX_AGE'] else 'per-request',
+            'conn_max_age': settings_dict['CONN_MAX_AGE'],
+            'health_checks': settings_dict['CONN_HEALTH_CHECKS'],
+            'opened': _opened.get(alias, 0),
+        }
+        if pool is not None:
+            stats = pool.get_stats()
+            database.update({
+                # w trybie puli sygnał connection_created oznacza wydanie połączenia z puli, nie nowe połączenie
+                'opened': stats.get('connections_num', 0),
+                'pool_min': stats.get('pool_min'),
+                'pool_max': stats.get('pool_max'),
+                'pool_size': stats.get('pool_size'),
+                'pool_available': stats.get('pool_available'),
+                'usage': (stats.get('pool_size', 0) - stats.get('pool_available', 0)) / stats['pool_max']
+                if stats.get('pool_max') else None,
+                'requests_waiting': stats.get('requests_waiting'),
+                'requests_num': stats.get('requests_num', 0),
+                'requests_wait_ms': stats.get('requests_wait_ms', 0),
+                'requests_errors': stats.get('requests_errors', 0),
+                'avg_wait_ms': stats.get('requests_wait_ms', 0) / stats['requests_num']
+                if stats.get('requests_num') else 0,
+            })
+        metrics['databases'][alias] = database
+    return metrics
+
+
+def release_connections():
+    """
+    Zamyka połączenia i pule bieżącego procesu. Wywoływane po starcie aplikacji (wsgi/asgi), aby procesy
+    robocze gunicorn --preload nie dziedziczyły gniazd otwartych w procesie nadrzędnym.
+    """
+    connections.close_all()
+    for alias in connections:
+        if _pool(alias) is not None:
+            connections[alias].close_pool()
+
+
+@contextmanager
+def connection_settings(alias, conn_max_age, pool=True):
+    """
+    Tymczasowo zmienia tryb połączeń bazy alias (benchmark). pool=False wyłącza pulę, jeśli jest skonfigurowana.
+    """
+    settings_dict = connections.settings[alias]
+    options = settings_dict.setdefault('OPTIONS', {})
+    saved = settings_dict['CONN_MAX_AGE'], options.get('pool')
+    release_connections()
+    settings_dict['CONN_MAX_AGE'] = conn_max_age
+    if not pool:
+        options.pop('pool', None)
+    try:
+        yield
+    finally:
+        release_connections()
+        settings_dict['CONN_MAX_AGE'] = saved[0]
+        if saved[1] is not None:
+            options['pool'] = saved[1]
@@ -0,0 +1,118 @@
+"""
+Kierowanie zapytań odczytu do replik bazy danych.
+
+ReplicaRoutingMiddleware na początku żądania wybiera zdrową replikę, ale tylko dla żądań tylko do odczytu
+(GET/HEAD) bez ciasteczka przypięcia. ReplicaRouter kieruje na nią odczyty. Każdy zapis trafia do bazy
+głównej i przypina do niej pozostałe odczyty tego żądania. Odpowiedź dostaje wtedy ciasteczko, które na
+REPLICA_PIN_SECONDS kieruje kolejne żądania użytkownika do bazy głównej, żeby opóźnienie replikacji nie
+ukryło przed nim jego własnych zmian.
+
+Stan replik jest sprawdzany co najwyżej raz na REPLICA_HEALTH_CHECK_INTERVAL sekund w każdym procesie.
+Niedostępna replika jest pomijana, a gdy żadna nie działa odczyty trafiają do bazy głównej.
+
+Wartości zapisywane do współdzielonego cache budowane są w bloku read_from_primary() - opóźniona replika
+utrwaliłaby w cache nieaktualne dane na cały czas życia wpisu.
+"""
+from asgiref.local import Local
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, DatabaseError
+
+import random
+import time
+
+PIN_COOKIE = 'db_primary_pin'
+
+_state = Local()
+_health = {}
+
+
+def replica_aliases():
+    return getattr(settings, 'REPLICA_DATABASES', [])
+
+
+def is_healthy(alias):
+    interval = getattr(settings, 'REPLICA_HEALTH_CHECK_INTERVAL', 30)
+    healthy, checked = _health.get(alias, (True, None))
+    if checked is not None and time.monotonic() - checked < interval:
+        return healthy
+
+    connection = connections[alias]
+    try:
+        connection.ensure_connection()
+        healthy = connection.is_usable()
+    except DatabaseError:
+        healthy = False
+    if not healthy:
+        connection.close()
+    _health[alias] = (healthy, time.monotonic())
+    return healthy
+
+
+def choose_replica():
+    replicas = [alias for alias in replica_aliases() if is_healthy(alias)]
+    return random.choice(replicas) if replicas else None
+
+
+def pin_to_primary():
+    """
+    Kieruje wszystkie dalsze zapytania bieżącego żądania do bazy głównej.
+    """
+    _state.replica = None
+    _state.written = True
+
+
+@contextmanager
+def read_from_primary():
+    """
+    Kieruje odczyty do bazy głównej na czas bloku, bez przypinania do niej reszty żądania.
+    """
+    replica = getattr(_state, 'replica', None)
+    _state.replica = None
+    try:
+        yield
+    finally:
+        # zapis w bloku przypina żądanie do bazy głównej
+        if not getattr(_state, 'written', False):
+            _state.replica = replica
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        replica = getattr(_state, 'replica', None)
+        if replica is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return replica
+
+    def db_for_write(self, model, **hints):
+        pin_to_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+class ReplicaRoutingMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.written = False
+        _state.replica = None
+        if request.method in ('GET', 'HEAD') and PIN_COOKIE not in request.COOKIES and replica_aliases():
+            _state.replica = choose_replica()
+
+        try:
+            response = self.get_response(request)
+            if _state.written or request.method not in ('GET', 'HEAD', 'OPTIONS'):
+                response.set_cookie(PIN_COOKIE, '1', max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 15),
+                                    httponly=True, samesite='Lax')
+        finally:
+            _state.replica = None
+            _state.written = False
+        return response
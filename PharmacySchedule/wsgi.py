@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'PharmacySchedule.settings')
 
 application = get_wsgi_application()
+
+from PharmacySchedule.dbpool import release_connections  # noqa: E402
+from schedule.startup import warm_up  # noqa: E402
+
+warm_up()
+release_connections()
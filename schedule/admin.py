@@ -1,7 +1,9 @@
 from django.contrib import admin
-from schedule.models import Person, Slot, Shift, Schedule
+from schedule.models import Pharmacy, Person, Slot, Shift, Schedule, Leave
 
+admin.site.register(Pharmacy)
 admin.site.register(Person)
 admin.site.register(Slot)
 admin.site.register(Shift)
 admin.site.register(Schedule)
+admin.site.register(Leave)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ScheduleConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'schedule'
+
+    def ready(self):
+        from schedule import signals  # noqa: F401
+        from PharmacySchedule import dbpool  # noqa: F401
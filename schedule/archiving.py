@@ -0,0 +1,34 @@
+"""
+Archiwizacja zakończonych terminarzy.
+
+Terminarz jest zapisywany jako jeden skompresowany wiersz ScheduleArchive (zmiany, sloty i nazwy osób z chwili
+archiwizacji; dla opublikowanego terminarza - jego opublikowana wersja), a następnie jego sloty są usuwane
+partiami. Widok terminarza, wydruk i eksport korzystają wtedy z zapisu archiwum zamiast z tabel Slot
+(schedule.snapshots).
+"""
+from django.db import router, transaction
+from schedule.models import Schedule, ScheduleArchive, PublishedSchedule, Slot
+from schedule.deletion import delete_slots_in_batches, ORPHAN_BATCH_SIZE
+from schedule.snapshots import build_snapshot
+
+
+def archive_schedule(schedule, batch_size=ORPHAN_BATCH_SIZE):
+    """
+    Archiwizuje terminarz i usuwa jego sloty. Ponowne wywołanie dla zarchiwizowanego terminarza dokańcza
+    usuwanie slotów. Zwraca liczbę usuniętych slotów.
+    """
+    with transaction.atomic(using=router.db_for_write(ScheduleArchive)):
+        if not ScheduleArchive.objects.filter(schedule=schedule).exists():
+            published = PublishedSchedule.objects.filter(schedule=schedule).first()
+            archive = ScheduleArchive(schedule=schedule)
+            archive.set_snapshot(published.get_snapshot() if published else build_snapshot(schedule))
+            archive.save()
+
+    return delete_slots_in_batches(Slot.objects.filter(shift__schedule=schedule), batch_size)
+
+
+def archivable_schedules(before):
+    """
+    Terminarze zakończone przed podaną datą, które nie zostały jeszcze zarchiwizowane.
+    """
+    return Schedule.objects.filter(end_date__lt=before, archive__isnull=True).order_by('start_day')
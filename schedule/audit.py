@@ -0,0 +1,77 @@
+"""
+Dziennik zmian przypisań osób do slotów.
+
+Zmiany zgłaszane są przez sygnał zapisu slotu (schedule.signals) i w trakcie żądania trafiają do bufora.
+AuditMiddleware zapisuje cały bufor jednym bulk_create na końcu żądania, a id terminarzy slotów ustala jednym
+zapytaniem - logowanie nie dodaje zapytań per slot. Poza żądaniem (bez bufora) wpis zapisywany jest od razu.
+"""
+from asgiref.local import Local
+from contextlib import contextmanager
+from schedule.models import AssignmentLog, Shift
+
+import datetime
+
+_state = Local()
+
+
+def record_change(slot, old_person_id, new_person_id):
+    entry = AssignmentLog(slot_id=slot.id, date=slot.date, old_person_id=old_person_id, new_person_id=new_person_id)
+    buffer = getattr(_state, 'buffer', None)
+    if buffer is None:
+        _write([entry])
+    else:
+        buffer.append(entry)
+
+
+def _write(entries, user=None):
+    schedules = dict(Shift.slots.through.objects.filter(slot_id__in=[e.slot_id for e in entries]).values_list(
+        'slot_id', 'shift__schedule_id'
+    ))
+    for entry in entries:
+        entry.schedule_id = schedules.get(entry.slot_id)
+        entry.user = user
+    AssignmentLog.objects.bulk_create(entries)
+
+
+@contextmanager
+def audit_buffer(user=None):
+    """
+    Buforuje wpisy dziennika i zapisuje je razem przy wyjściu z bloku.
+    """
+    _state.buffer = []
+    try:
+        yield
+    finally:
+        entries, _state.buffer = _state.buffer, None
+        if entries:
+            _write(entries, user)
+
+
+class AuditMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with audit_buffer(request.user if request.user.is_authenticated else None):
+            return self.get_response(request)
+
+
+def schedule_history(schedule, start=None, end=None):
+    entries = AssignmentLog.objects.filter(schedule_id=schedule.id)
+    return _history(entries, start, end)
+
+
+def person_history(person, start=None, end=None):
+    entries = AssignmentLog.objects.filter(old_person_id=person.id) | \
+        AssignmentLog.objects.filter(new_person_id=person.id)
+    return _history(entries, start, end)
+
+
+def _history(entries, start, end):
+    if start is not None:
+        entries = entries.filter(created_at__gte=datetime.datetime.combine(start, datetime.time.min))
+    if end is not None:
+        entries = entries.filter(created_at__lt=datetime.datetime.combine(end + datetime.timedelta(days=1),
+                                                                         datetime.time.min))
+    return entries.select_related('old_person', 'new_person', 'user').order_by('-created_at', '-id')
@@ -0,0 +1,65 @@
+"""
+Dostępność osób - filtrowanie kandydatów do slotów na podstawie okresów nieobecności (Leave).
+
+Nieobecności nachodzące na okno terminarza pobierane są jednym zapytaniem zakresowym i rozwijane w pamięci
+na poszczególne dni, więc liczba zapytań nie zależy od liczby dni ani slotów. W PostgreSQL zapytanie sprawdza
+nakładanie się zakresów dat (&&), co wykorzystuje indeks GiST leave_daterange_gist; w pozostałych bazach
+porównywane są daty graniczne (indeksy (pharmacy, start_date, end_date) oraz (person, start_date, end_date)).
+"""
+from django.db import connections
+from django.db.models import BooleanField
+from django.db.models.expressions import RawSQL
+from schedule.models import Leave
+
+import datetime
+
+# to samo wyrażenie co w indeksie leave_daterange_gist (migracja 0009) - inaczej indeks nie zostanie użyty
+DATERANGE_OVERLAP_SQL = "daterange(schedule_leave.start_date, schedule_leave.end_date, '[]') && daterange(%s, %s, '[]')"
+
+
+def leaves_in_window(start, end, person_ids=None, manager=Leave.objects):
+    """
+    Nieobecności nachodzące na okres start - end (włącznie).
+    """
+    if connections[manager.db].vendor == 'postgresql':
+        leaves = manager.filter(RawSQL(DATERANGE_OVERLAP_SQL, (start, end), output_field=BooleanField()))
+    else:
+        leaves = manager.filter(start_date__lte=end, end_date__gte=start)
+    if person_ids is not None:
+        leaves = leaves.filter(person_id__in=person_ids)
+    return leaves
+
+
+def unavailable_by_day(start, end, person_ids=None, manager=Leave.objects):
+    """
+    Zwraca słownik {dzień: zbiór id osób nieobecnych} dla dni z okresu start - end.
+    """
+    unavailable = {}
+    rows = leaves_in_window(start, end, person_ids, manager).values_list('person_id', 'start_date', 'end_date')
+    for person_id, leave_start, leave_end in rows:
+        day = max(leave_start, start)
+        while day <= min(leave_end, end):
+            unavailable.setdefault(day, set()).add(person_id)
+            day += datetime.timedelta(days=1)
+    return unavailable
+
+
+def candidates_by_day(persons, days):
+    """
+    Zwraca słownik {dzień: lista osób dostępnych w danym dniu} dla podanych dni (lista dni terminarza).
+    """
+    unavailable = unavailable_by_day(days[0], days[-1]) if days else {}
+    return {d: [p for p in persons if p.id not in unavailable.get(d, ())] for d in days}
+
+
+def find_conflicts(slots):
+    """
+    Zwraca sloty, do których przypisano osobę nieobecną w dniu slotu. Sprawdzenie wykonywane jest jednym
+    zapytaniem dla wszystkich slotów, niezależnie od apteki bieżącego żądania.
+    """
+    slots = [slot for slot in slots if slot.person_id is not None]
+    if not slots:
+        return []
+    dates = [slot.date for slot in slots]
+    unavailable = unavailable_by_day(min(dates), max(dates), {slot.person_id for slot in slots}, Leave.all_objects)
+    return [slot for slot in slots if slot.person_id in unavailable.get(slot.date, ())]
@@ -0,0 +1,91 @@
+"""
+Wspólna warstwa cache dla często odczytywanych danych referencyjnych (osoby, grupy, terminarze).
+
+Klucze zawierają numer wersji przestrzeni nazw oraz - dla danych aptek - id bieżącej apteki. Zmiana danych
+(sygnały w schedule.signals) podbija wersję, przez co wszystkie wpisy danej przestrzeni przestają być używane
+i wygasają same.
+"""
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from PharmacySchedule.routers import read_from_primary
+from schedule.models import Pharmacy, Person, Schedule
+from schedule.tenancy import get_current_pharmacy
+
+import time
+
+CACHE_TIMEOUT = 60 * 60
+
+
+def _version_key(namespace):
+    return f'schedule:{namespace}:version'
+
+
+def get_version(namespace):
+    version = cache.get(_version_key(namespace))
+    if version is None:
+        cache.add(_version_key(namespace), 1, None)
+        version = cache.get(_version_key(namespace), 1)
+    return version
+
+
+def bump_version(namespace):
+    try:
+        cache.incr(_version_key(namespace))
+    except ValueError:
+        # brak klucza wersji (np. wyczyszczony cache) - nowa wersja nie może pokryć się z żadną wcześniejszą
+        cache.set(_version_key(namespace), time.time_ns(), None)
+
+
+def cached(namespace, name, builder, timeout=CACHE_TIMEOUT, scoped=True):
+    """
+    Zwraca wartość z cache, a przy jej braku wywołuje builder() i zapisuje wynik pod bieżącą wersją.
+    builder() czyta z bazy głównej, nie z repliki.
+    scoped - wartość zależy od apteki bieżącego żądania
+    """
+    key = f'schedule:{namespace}:{get_version(namespace)}:{name}'
+    if scoped:
+        pharmacy = get_current_pharmacy()
+        key = f'{key}:{"all" if pharmacy is None else pharmacy.id or "none"}'
+    value = cache.get(key)
+    if value is None:
+        with read_from_primary():
+            value = builder()
+        cache.set(key, value, timeout)
+    return value
+
+
+def active_persons():
+    return cached('persons', 'active', lambda: list(Person.objects.filter(user__isnull=False)))
+
+
+def all_persons():
+    return cached('persons', 'all', lambda: list(Person.objects.select_related('user')))
+
+
+def all_groups():
+    return cached('groups', 'all', lambda: list(Group.objects.all()), scoped=False)
+
+
+def user_pharmacy(user):
+    """
+    Zwraca aptekę osoby przypisanej do użytkownika albo None. Osoba szukana jest w bazie domyślnej, a następnie
+    w bazach aptek z osobnym aliasem bazy danych.
+    """
+    def builder():
+        databases = Pharmacy.objects.exclude(database=DEFAULT_DB_ALIAS).values_list('database', flat=True)
+        for database in [DEFAULT_DB_ALIAS, *sorted(set(databases))]:
+            person = Person.all_objects.using(database).filter(user_id=user.id).values('pharmacy_id').first()
+            if person is not None:
+                return (Pharmacy.objects.filter(id=person['pharmacy_id'], database=database).first(),)
+        return (None,)
+
+    return cached('persons', f'pharmacy:{user.id}', builder, scoped=False)[0]
+
+
+def all_schedules():
+    return cached('schedules', 'all', lambda: list(Schedule.objects.all()))
+
+
+def get_schedule(schedule_id):
+    return cached('schedules', f'id:{schedule_id}', lambda: Schedule.objects.get(id=schedule_id))
@@ -0,0 +1,73 @@
+"""
+Klonowanie terminarzy.
+
+Nowy terminarz otrzymuje kopie zmian źródłowego terminarza oraz - opcjonalnie - jego wzór przypisań powtarzany
+w cyklu N dni. Wszystkie wiersze Shift, Slot oraz tabeli pośredniej tworzone są operacjami bulk_create
+w jednej transakcji. Przypisania osób nieobecnych w danym dniu (schedule.availability) są pomijane.
+"""
+from django.db import router, transaction
+from schedule.models import Schedule, Shift, Slot
+from schedule.availability import find_conflicts
+from schedule.ical import invalidate_feed
+
+import datetime
+
+
+def clone_schedule(source, name, start_day, end_date, copy_assignments=False, rotation_days=7, offset=0):
+    """
+    Tworzy nowy terminarz na podstawie terminarza source.
+
+    copy_assignments - kopiuje przypisania aktywnych osób
+    rotation_days - długość cyklu wzoru przypisań w dniach (7 - cykl tygodniowy). Wzór jest liczony od pierwszego
+    dnia terminarza źródłowego, więc przy cyklu tygodniowym poniedziałek nowego terminarza otrzymuje obsadę
+    poniedziałku źródłowego, a cykl N-dniowy jest kontynuowany bez przerwy.
+    offset - przesunięcie wzoru w dniach (rotacja obsady)
+    """
+    database = router.db_for_write(Schedule)
+    with transaction.atomic(using=database):
+        schedule = Schedule.objects.create(name=name, start_day=start_day, end_date=end_date,
+                                           pharmacy_id=source.pharmacy_id)
+
+        source_shifts = list(Shift.objects.filter(schedule=source).order_by('id'))
+        shifts = Shift.objects.bulk_create([
+            Shift(schedule=schedule, pharmacy_id=schedule.pharmacy_id, name=s.name, shift_type=s.shift_type,
+                  start_hour=s.start_hour, end_hour=s.end_hour, capacity=s.capacity)
+            for s in source_shifts
+        ])
+
+        pattern = {}
+        if copy_assignments:
+            rows = Shift.slots.through.objects.filter(shift__schedule=source).order_by('slot_id').values_list(
+                'shift_id', 'slot__date', 'slot__person_id', 'slot__person__user_id'
+            )
+            for shift_id, date, person_id, user_id in rows:
+                pattern.setdefault((shift_id, date), []).append(person_id if user_id else None)
+
+        days = schedule.get_days()
+        slots = []
+        owners = []
+        for source_shift, shift in zip(source_shifts, shifts):
+            for d in days:
+                persons = []
+                if pattern:
+                    source_day = source.start_day + datetime.timedelta(
+                        days=((d - source.start_day).days + offset) % rotation_days
+                    )
+                    persons = pattern.get((source_shift.id, source_day), [])
+                for num in range(shift.capacity):
+                    slots.append(Slot(date=d, person_id=persons[num] if num < len(persons) else None))
+                    owners.append(shift)
+
+        for slot in find_conflicts(slots):
+            slot.person_id = None
+
+        slots = Slot.objects.bulk_create(slots)
+        Shift.slots.through.objects.bulk_create([
+            Shift.slots.through(shift_id=shift.id, slot_id=slot.id) for shift, slot in zip(owners, slots)
+        ])
+
+        # bulk_create nie wysyła sygnałów - kanały kalendarzy osób trzeba unieważnić ręcznie
+        person_ids = {slot.person_id for slot in slots if slot.person_id}
+        transaction.on_commit(lambda: invalidate_feed(*person_ids), using=database)
+
+    return schedule
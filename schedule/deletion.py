@@ -0,0 +1,88 @@
+"""
+Usuwanie terminarzy i zmian wraz z ich slotami oraz sprzątanie osieroconych slotów.
+
+Usuwanie odbywa się zapytaniami na zbiorach wierszy (bez pętli po obiektach) w jednej transakcji.
+Ponieważ takie usuwanie nie wysyła sygnałów per obiekt, kanały kalendarzy osób unieważniane są tutaj.
+"""
+from django.db import router, transaction
+from django.db.models import F, Q
+from schedule.models import Schedule, Shift, Slot
+from schedule.ical import invalidate_feed
+
+ORPHAN_BATCH_SIZE = 1000
+
+
+def _delete_slots(slots):
+    """
+    Usuwa sloty z przekazanego querysetu i zwraca liczbę usuniętych slotów. Wiersze tabeli pośredniej
+    Shift.slots usuwa kaskadowo QuerySet.delete().
+    """
+    rows = list(slots.values_list('id', 'person_id').distinct())
+    if not rows:
+        return 0
+    ids = [slot_id for slot_id, _ in rows]
+    person_ids = {person_id for _, person_id in rows if person_id}
+
+    deleted = Slot.objects.filter(id__in=ids).delete()[1].get(Slot._meta.label, 0)
+    transaction.on_commit(lambda: invalidate_feed(*person_ids), using=router.db_for_write(Slot))
+    return deleted
+
+
+def delete_shifts(shifts):
+    """
+    Usuwa zmiany z przekazanego querysetu razem z ich slotami.
+    """
+    with transaction.atomic(using=router.db_for_write(Shift)):
+        _delete_slots(Slot.objects.filter(shift__in=shifts))
+        shifts.delete()
+
+
+def delete_schedule(schedule):
+    with transaction.atomic(using=router.db_for_write(Schedule)):
+        delete_shifts(Shift.objects.filter(schedule=schedule))
+        schedule.delete()
+
+
+def orphaned_slots(schedule=None):
+    """
+    Zwraca queryset osieroconych slotów:
+    - slotów nieprzypisanych do żadnej zmiany (pomijane, gdy podano terminarz),
+    - slotów z datą spoza zakresu dat terminarza, do którego należy ich zmiana.
+    """
+    out_of_range = Q(shift__schedule__start_day__gt=F('date')) | Q(shift__schedule__end_date__lt=F('date'))
+
+    if schedule is not None:
+        return Slot.objects.filter(out_of_range, shift__schedule=schedule)
+    return Slot.objects.filter(Q(shift__isnull=True) | out_of_range)
+
+
+def collect_orphans(schedule=None, batch_size=ORPHAN_BATCH_SIZE, dry_run=False):
+    """
+    Usuwa osierocone sloty partiami po batch_size w osobnych transakcjach.
+    Zwraca słownik z liczbą slotów nieprzypisanych do zmian[unattached], slotów spoza zakresu dat
+    terminarza[out_of_range] oraz faktycznie usuniętych slotów[deleted].
+    """
+    report = {
+        'unattached': 0 if schedule is not None else Slot.objects.filter(shift__isnull=True).count(),
+        'out_of_range': orphaned_slots(schedule).exclude(shift__isnull=True).values('id').distinct().count(),
+        'deleted': 0,
+    }
+    if dry_run:
+        return report
+
+    report['deleted'] = delete_slots_in_batches(orphaned_slots(schedule), batch_size)
+    return report
+
+
+def delete_slots_in_batches(slots, batch_size=ORPHAN_BATCH_SIZE):
+    """
+    Usuwa sloty z przekazanego querysetu partiami po batch_size, każdą partię w osobnej transakcji.
+    Zwraca liczbę usuniętych slotów.
+    """
+    deleted = 0
+    while True:
+        ids = list(slots.values_list('id', flat=True).distinct()[:batch_size])
+        if not ids:
+            return deleted
+        with transaction.atomic(using=router.db_for_write(Slot)):
+            deleted += _delete_slots(Slot.objects.filter(id__in=ids))
@@ -0,0 +1,209 @@
+"""
+Eksport przypisań z terminarzy do formatów CSV oraz XLSX.
+
+Wiersze są generowane leniwie z jednego zapytania do tabeli pośredniej Shift.slots (iterator z chunk_size),
+a pliki budowane są kawałkami, więc zużycie pamięci nie zależy od liczby eksportowanych slotów.
+Wiersze terminarzy zarchiwizowanych i opublikowanych odtwarzane są z ich zapisów i scalane z wierszami slotów
+w kolejności dat. Zapis odczytywany jest dopiero, gdy scalanie dojdzie do pierwszego dnia jego terminarza.
+"""
+from schedule.models import Shift, ScheduleArchive, PublishedSchedule, DAYS, TITLE_CHOICES
+from schedule.tenancy import scope_to_pharmacy
+from schedule.snapshots import snapshot_rows
+from django.db.models import F
+from xml.sax.saxutils import escape
+
+import csv
+import heapq
+import itertools
+import operator
+import zipfile
+
+EXPORT_HEADER = ('schedule', 'date', 'weekday', 'shift_hours', 'shift_type', 'person', 'title')
+CHUNK_SIZE = 2000
+
+TITLES = dict(TITLE_CHOICES)
+
+
+def assignment_rows(schedule=None, start=None, end=None):
+    """
+    Zwraca generator wierszy eksportu - jeden wiersz na slot.
+    schedule - ogranicza eksport do jednego terminarza
+    start, end - ogranicza eksport do slotów z podanego zakresu dat (włącznie)
+
+    Zapytania budowane są od razu (nie w generatorze) i przypinane do bazy wybranej przez router, bo odpowiedź
+    strumieniowa odczytuje wiersze już po zakończeniu middleware, gdy apteka bieżącego żądania (a więc i jej
+    baza danych) nie jest już ustawiona.
+    """
+    rows = Shift.slots.through.objects.filter(shift__schedule__published__isnull=True)
+    snapshots = [
+        ScheduleArchive.objects.all(),
+        PublishedSchedule.objects.filter(schedule__archive__isnull=True),
+    ]
+    rows = scope_to_pharmacy(rows, 'shift__pharmacy')
+    snapshots = [scope_to_pharmacy(s, 'schedule__pharmacy') for s in snapshots]
+    if schedule is not None:
+        rows = rows.filter(shift__schedule=schedule)
+        snapshots = [s.filter(schedule=schedule) for s in snapshots]
+    if start is not None:
+        rows = rows.filter(slot__date__gte=start)
+        snapshots = [s.filter(schedule__end_date__gte=start) for s in snapshots]
+    if end is not None:
+        rows = rows.filter(slot__date__lte=end)
+        snapshots = [s.filter(schedule__start_day__lte=end) for s in snapshots]
+    snapshots = [
+        s.using(s.db).annotate(start_day=F('schedule__start_day')).order_by('start_day', 'schedule_id')
+        for s in snapshots
+    ]
+
+    rows = rows.using(rows.db).order_by('slot__date', 'shift__schedule_id', 'shift__start_hour', 'slot_id')
+    rows = rows.values_list(
+        'shift__schedule__name', 'slot__date', 'shift__start_hour', 'shift__end_hour', 'shift__shift_type',
+        'slot__person__name', 'slot__person__title'
+    )
+
+    return _merge_by_date(_format_rows(rows), snapshots, start, end)
+
+
+def _format_rows(rows):
+    for schedule_name, date, start_hour, end_hour, shift_type, person, title in rows.iterator(chunk_size=CHUNK_SIZE):
+        hours = f'{start_hour:%H:%M}-{end_hour:%H:%M}' if start_hour and end_hour else ''
+        yield (schedule_name, date.isoformat(), DAYS[date.isoweekday() - 1], hours, shift_type, person or '',
+               TITLES.get(title, title or ''))
+
+
+def _snapshot_rows(snapshot, start, end):
+    start = start.isoformat() if start else None
+    end = end.isoformat() if end else None
+    for row in snapshot_rows(snapshot.get_snapshot()):
+        if (start is None or row[1] >= start) and (end is None or row[1] <= end):
+            yield row
+
+
+def _merge_by_date(rows, snapshots, start, end):
+    """
+    Scala posortowane po dacie wiersze slotów z wierszami zapisów. Zapisy (uporządkowane po pierwszym dniu
+    terminarza) otwierane są po kolei, więc w pamięci są tylko zapisy terminarzy nakładających się w czasie.
+    """
+    heap = []
+    order = itertools.count()
+
+    def push(source):
+        row = next(source, None)
+        if row is not None:
+            heapq.heappush(heap, (row[1], next(order), row, source))
+
+    push(rows)
+    pending = heapq.merge(*[s.iterator() for s in snapshots], key=operator.attrgetter('start_day'))
+    snapshot = next(pending, None)
+    while heap or snapshot is not None:
+        if snapshot is not None and (not heap or snapshot.start_day.isoformat() <= heap[0][0]):
+            push(_snapshot_rows(snapshot, start, end))
+            snapshot = next(pending, None)
+            continue
+        _, _, row, source = heapq.heappop(heap)
+        yield row
+        push(source)
+
+
+class Echo:
+    """
+    Pseudo-bufor dla csv.writer - zamiast zapisywać zwraca przekazaną wartość.
+    """
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_HEADER)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+class _ChunkBuffer:
+    """
+    Bufor bez seek/tell, do którego zipfile dopisuje dane. Zawartość jest odbierana metodą drain(),
+    dzięki czemu archiwum może być wysyłane w trakcie tworzenia.
+    """
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+XLSX_STATIC_PARTS = (
+    ('[Content_Types].xml',
+     '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+     '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+     '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+     '<Default Extension="xml" ContentType="application/xml"/>'
+     '<Override PartName="/xl/workbook.xml" '
+     'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+     '<Override PartName="/xl/worksheets/sheet1.xml" '
+     'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+     '</Types>'),
+    ('_rels/.rels',
+     '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+     '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+     '<Relationship Id="rId1" '
+     'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+     'Target="xl/workbook.xml"/>'
+     '</Relationships>'),
+    ('xl/workbook.xml',
+     '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+     '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+     'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+     '<sheets><sheet name="Schedule" sheetId="1" r:id="rId1"/></sheets>'
+     '</workbook>'),
+    ('xl/_rels/workbook.xml.rels',
+     '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+     '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+     '<Relationship Id="rId1" '
+     'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+     'Target="worksheets/sheet1.xml"/>'
+     '</Relationships>'),
+)
+
+
+def _xlsx_row(row):
+    cells = ''.join(f'<c t="inlineStr"><is><t>{escape(str(value))}</t></is></c>' for value in row)
+    return f'<row>{cells}</row>'
+
+
+def stream_xlsx(rows):
+    """
+    Generuje plik XLSX (jeden arkusz, komórki typu inlineStr) kawałek po kawałku. Nie wymaga zewnętrznych
+    bibliotek - archiwum budowane jest przez zipfile w trybie strumieniowym.
+    """
+    buffer = _ChunkBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in XLSX_STATIC_PARTS:
+            archive.writestr(name, content)
+        yield buffer.drain()
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w') as sheet:
+            sheet.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                        b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+            sheet.write(_xlsx_row(EXPORT_HEADER).encode('utf-8'))
+            for num, row in enumerate(rows, start=1):
+                sheet.write(_xlsx_row(row).encode('utf-8'))
+                if num % CHUNK_SIZE == 0:
+                    yield buffer.drain()
+            sheet.write(b'</sheetData></worksheet>')
+    yield buffer.drain()
+
+
+EXPORT_FORMATS = {
+    'csv': (stream_csv, 'text/csv; charset=utf-8'),
+    'xlsx': (stream_xlsx, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
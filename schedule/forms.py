@@ -1,12 +1,15 @@
 from django import forms
-from schedule.models import Schedule, Person, TITLE_CHOICES, Shift
+from django.conf import settings
+from schedule.models import Pharmacy, Schedule, Person, TITLE_CHOICES, Shift, Leave
+from schedule.tenancy import current_database, get_current_pharmacy
 from django.contrib.auth.models import Group, User
+from django.db.models import Q
 
 
 class ScheduleForm(forms.ModelForm):
     class Meta:
         model = Schedule
-        fields = '__all__'
+        exclude = ('pharmacy',)
 
         widgets = {
             'start_day': forms.DateInput(format='%d/%m/%Y', attrs={'type': 'date'}),
@@ -17,7 +20,17 @@ class ScheduleForm(forms.ModelForm):
 class PersonForm(forms.ModelForm):
     class Meta:
         model = Person
-        fields = '__all__'
+        exclude = ('pharmacy',)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # konta bez przypisanej osoby albo przypisane do osób apteki bieżącego żądania; osoby aptek z osobną bazą
+        # danych nie są widoczne w bazie kont, więc ich konta wykluczane są po id
+        database = current_database()
+        own = list(Person.objects.exclude(user=None).values_list('user_id', flat=True))
+        taken = [user_id for alias in settings.TENANT_DATABASES if alias != database
+                 for user_id in Person.all_objects.using(alias).exclude(user=None).values_list('user_id', flat=True)]
+        self.fields['user'].queryset = User.objects.filter(Q(person__isnull=True) | Q(id__in=own)).exclude(id__in=taken)
 
 
 class GroupForm(forms.ModelForm):
@@ -46,6 +59,11 @@ class ShiftForm(forms.ModelForm):
             'end_hour': forms.TimeInput(attrs={'type': 'time'}, format="%H:%M")
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # queryset pola tworzony jest przy definicji klasy - ograniczenie do apteki bieżącego żądania
+        self.fields['schedule'].queryset = Schedule.objects.all()
+
 class UserPersonForm(forms.Form):
     """groups = Group.objects.all()
 
@@ -59,3 +77,77 @@ class UserPersonForm(forms.Form):
     name = forms.CharField(required=True)
     title = forms.ChoiceField(choices=TITLE_CHOICES)
     group = forms.ModelMultipleChoiceField(queryset=Group.objects.all(), required=False)
+
+
+class ExportRangeForm(forms.Form):
+    start = forms.DateField(required=True)
+    end = forms.DateField(required=True)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start = cleaned_data.get('start')
+        end = cleaned_data.get('end')
+
+        if start and end and start > end:
+            raise forms.ValidationError('Data początkowa nie może być późniejsza niż końcowa')
+        return cleaned_data
+
+
+class ScheduleCloneForm(forms.Form):
+    name = forms.CharField(max_length=32, required=True)
+    start_day = forms.DateField(required=True, widget=forms.DateInput(attrs={'type': 'date'}))
+    end_date = forms.DateField(required=True, widget=forms.DateInput(attrs={'type': 'date'}))
+    copy_assignments = forms.BooleanField(required=False)
+    rotation_days = forms.IntegerField(min_value=1, initial=7)
+    offset = forms.IntegerField(initial=0)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start_day = cleaned_data.get('start_day')
+        end_date = cleaned_data.get('end_date')
+
+        if start_day and end_date and start_day > end_date:
+            raise forms.ValidationError('Data początkowa nie może być późniejsza niż końcowa')
+        return cleaned_data
+
+
+class PersonImportForm(forms.Form):
+    file = forms.FileField(required=True)
+    dry_run = forms.BooleanField(required=False)
+    pharmacy = forms.ModelChoiceField(queryset=Pharmacy.objects.all(), required=False)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # aptekę wybiera tylko użytkownik widzący wszystkie apteki - pozostali importują osoby do swojej
+        if get_current_pharmacy() is not None:
+            del self.fields['pharmacy']
+
+
+class HistoryFilterForm(forms.Form):
+    start = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    end = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+
+
+class LeaveForm(forms.ModelForm):
+    class Meta:
+        model = Leave
+        exclude = ('pharmacy',)
+
+        widgets = {
+            'start_date': forms.DateInput(attrs={'type': 'date'}),
+            'end_date': forms.DateInput(attrs={'type': 'date'}),
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # queryset pola tworzony jest przy definicji klasy - ograniczenie do apteki bieżącego żądania
+        self.fields['person'].queryset = Person.objects.filter(user__isnull=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start_date = cleaned_data.get('start_date')
+        end_date = cleaned_data.get('end_date')
+
+        if start_date and end_date and start_date > end_date:
+            raise forms.ValidationError('Data początkowa nie może być późniejsza niż końcowa')
+        return cleaned_data
@@ -0,0 +1,129 @@
+"""
+Kanał iCalendar (.ics) z przypisaniami danej osoby.
+
+Kanał budowany jest jednym zapytaniem po indeksie Slot(person, date) i trzymany w cache do czasu zmiany
+przypisań tej osoby (unieważnianie w schedule.signals), więc odpytywanie przez kalendarz to jeden odczyt z cache.
+Sloty zarchiwizowanych terminarzy są usuwane, więc ich wydarzenia pochodzą z zapisów archiwów (schedule.snapshots).
+Token osoby apteki z osobną bazą danych zawiera także id apteki - id osób w różnych bazach mogą się powtarzać.
+"""
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from PharmacySchedule.routers import read_from_primary
+from schedule.models import Schedule, Shift
+from schedule.snapshots import get_schedule_snapshot, snapshot_person_slots
+from schedule.tenancy import current_database
+
+import datetime
+import hashlib
+
+FEED_SALT = 'schedule.ical'
+FEED_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def feed_token(person):
+    value = str(person.id)
+    if person.pharmacy_id is not None and person.pharmacy.database != DEFAULT_DB_ALIAS:
+        value = f'{value}:{person.pharmacy_id}'
+    return signing.Signer(salt=FEED_SALT).sign(value)
+
+
+def person_from_token(token):
+    """
+    Zwraca parę (id osoby, id apteki z osobną bazą danych albo None) zapisaną w tokenie albo None jeśli token
+    jest niepoprawny.
+    """
+    try:
+        person_id, _, pharmacy_id = signing.Signer(salt=FEED_SALT).unsign(token).partition(':')
+        return int(person_id), int(pharmacy_id) if pharmacy_id else None
+    except (signing.BadSignature, ValueError):
+        return None
+
+
+def feed_cache_key(person_id):
+    return f'schedule:ical:{current_database()}:{person_id}'
+
+
+def invalidate_feed(*person_ids):
+    cache.delete_many([feed_cache_key(person_id) for person_id in set(person_ids) if person_id])
+
+
+def _escape(text):
+    return str(text).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+
+def _fold(line):
+    """
+    Zawija linie dłuższe niż 75 bajtów zgodnie z RFC 5545.
+    """
+    data = line.encode('utf-8')
+    if len(data) <= 75:
+        return line
+    parts = []
+    while len(data) > 75:
+        cut = 75 if not parts else 74
+        while cut and (data[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(data[:cut].decode('utf-8'))
+        data = data[cut:]
+    parts.append(data.decode('utf-8'))
+    return '\r\n '.join(parts)
+
+
+def build_feed(person_id):
+    """
+    Buduje treść kalendarza dla osoby o podanym id.
+    """
+    rows = Shift.slots.through.objects.filter(slot__person_id=person_id, shift__schedule__archive__isnull=True)
+    rows = list(rows.values_list('slot_id', 'shift_id', 'slot__date', 'shift__start_hour', 'shift__end_hour',
+                                 'shift__name', 'shift__schedule__name'))
+    for schedule in Schedule.objects.filter(archive__isnull=False):
+        rows += snapshot_person_slots(get_schedule_snapshot(schedule)[1], person_id)
+    rows.sort(key=lambda row: (row[2], row[3] is None, row[3] or datetime.time.min))
+
+    stamp = datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//PharmacySchedule//Schedule//PL',
+        'CALSCALE:GREGORIAN',
+        f'X-WR-TIMEZONE:{settings.TIME_ZONE}',
+    ]
+
+    for slot_id, shift_id, date, start_hour, end_hour, shift_name, schedule_name in rows:
+        if start_hour and end_hour:
+            start = datetime.datetime.combine(date, start_hour)
+            end = datetime.datetime.combine(date, end_hour)
+            if end <= start:
+                end += datetime.timedelta(days=1)
+            dates = [f'DTSTART:{start:%Y%m%dT%H%M%S}', f'DTEND:{end:%Y%m%dT%H%M%S}']
+        else:
+            dates = [f'DTSTART;VALUE=DATE:{date:%Y%m%d}']
+
+        lines += [
+            'BEGIN:VEVENT',
+            f'UID:slot-{slot_id}-shift-{shift_id}@pharmacyschedule',
+            f'DTSTAMP:{stamp}',
+            *dates,
+            f'SUMMARY:{_escape(shift_name)}',
+            f'DESCRIPTION:{_escape(schedule_name)}',
+            'END:VEVENT',
+        ]
+
+    lines.append('END:VCALENDAR')
+    return '\r\n'.join(_fold(line) for line in lines) + '\r\n'
+
+
+def get_feed(person_id):
+    """
+    Zwraca parę (etag, treść) z cache, a przy braku wpisu buduje kanał z bazy głównej i zapisuje go w cache.
+    """
+    key = feed_cache_key(person_id)
+    feed = cache.get(key)
+    if feed is None:
+        with read_from_primary():
+            body = build_feed(person_id)
+        feed = (f'"{hashlib.md5(body.encode("utf-8")).hexdigest()}"', body)
+        cache.set(key, feed, FEED_CACHE_TIMEOUT)
+    return feed
@@ -0,0 +1,156 @@
+"""
+Import osób (użytkownik + osoba + grupy) z pliku CSV.
+
+Wszystkie wiersze są najpierw walidowane - jeśli którykolwiek zawiera błędy nic nie jest zapisywane.
+Hashowanie haseł (celowo wolne) odbywa się równolegle w puli procesów, a wiersze User, członkostwa w grupach
+oraz Person zapisywane są operacjami bulk_create w jednej transakcji.
+
+Oczekiwane kolumny: username, password, name, title, groups (nazwy grup oddzielone średnikiem, opcjonalnie).
+"""
+from concurrent.futures import ProcessPoolExecutor
+from django.contrib.auth import password_validation
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from django.core.exceptions import ValidationError
+from django.db import DEFAULT_DB_ALIAS, transaction
+from schedule.models import Pharmacy, Person, TITLE_CHOICES
+from schedule.caching import bump_version
+from schedule.tenancy import get_current_pharmacy, NO_PHARMACY
+
+import csv
+import os
+
+IMPORT_COLUMNS = ('username', 'password', 'name', 'title', 'groups')
+
+TITLES = {key: key for key, label in TITLE_CHOICES} | {label: key for key, label in TITLE_CHOICES}
+
+
+def read_rows(lines):
+    """
+    Zwraca listę par (numer linii, wiersz) z pliku CSV przekazanego jako iterowalny obiekt z liniami tekstu.
+    """
+    reader = csv.DictReader(lines)
+    missing = [column for column in IMPORT_COLUMNS[:4] if column not in (reader.fieldnames or ())]
+    if missing:
+        raise ValidationError(f'Brak kolumn: {", ".join(missing)}')
+    return [(reader.line_num, row) for row in reader]
+
+
+def validate_rows(rows):
+    """
+    Sprawdza wszystkie wiersze i zwraca parę (poprawne wiersze, błędy), gdzie błędy to lista
+    par (numer linii, komunikat).
+    """
+    errors = []
+    valid = []
+
+    usernames = [User.normalize_username((row.get('username') or '').strip()) for num, row in rows]
+    existing = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+    groups = {group.name: group for group in Group.objects.all()}
+    seen = set()
+
+    for (num, row), username in zip(rows, usernames):
+        row_errors = []
+        password = row.get('password') or ''
+        name = (row.get('name') or '').strip()
+        title = TITLES.get((row.get('title') or '').strip())
+        group_names = [g.strip() for g in (row.get('groups') or '').split(';') if g.strip()]
+
+        if not username:
+            row_errors.append('brak nazwy użytkownika')
+        elif username in existing:
+            row_errors.append(f'użytkownik {username} już istnieje')
+        elif username in seen:
+            row_errors.append(f'użytkownik {username} powtarza się w pliku')
+        seen.add(username)
+
+        if username:
+            # walidatory pola (dozwolone znaki, max_length) - bulk_create ich nie uruchamia
+            try:
+                User._meta.get_field('username').clean(username, None)
+            except ValidationError as e:
+                row_errors += e.messages
+
+        if not name:
+            row_errors.append('brak nazwy osoby')
+        elif len(name) > Person._meta.get_field('name').max_length:
+            row_errors.append('zbyt długa nazwa osoby')
+
+        if not title:
+            row_errors.append(f'niepoprawny tytuł {row.get("title")}')
+
+        unknown = [g for g in group_names if g not in groups]
+        if unknown:
+            row_errors.append(f'nieznane grupy: {", ".join(unknown)}')
+
+        try:
+            password_validation.validate_password(password, user=User(username=username))
+        except ValidationError as e:
+            row_errors += e.messages
+
+        if row_errors:
+            errors += [(num, message) for message in row_errors]
+        else:
+            valid.append({'username': username, 'password': password, 'name': name, 'title': title,
+                          'groups': [groups[g] for g in group_names]})
+
+    return valid, errors
+
+
+def hash_passwords(passwords, workers=None):
+    workers = min(workers or os.cpu_count() or 1, len(passwords))
+    if workers <= 1:
+        return [make_password(password) for password in passwords]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(make_password, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
+
+
+def import_persons(lines, workers=None, dry_run=False, pharmacy=None):
+    """
+    Importuje osoby z pliku CSV. Zwraca parę (liczba utworzonych osób, błędy), gdzie błędy to pary
+    (numer linii albo None dla błędów całego pliku, komunikat). Plik bez wierszy z osobami i plik w kodowaniu
+    innym niż UTF-8 też są błędem. Jeśli wystąpiły błędy albo dry_run jest ustawione, nic nie zostaje zapisane.
+    pharmacy - apteka nowych osób, domyślnie apteka bieżącego żądania. Jeśli istnieje jakakolwiek apteka,
+    jest wymagana - osoby bez apteki nie byłyby widoczne dla nikogo poza superużytkownikami.
+    """
+    if pharmacy is None:
+        pharmacy = get_current_pharmacy()
+    if pharmacy is NO_PHARMACY or pharmacy is None and Pharmacy.objects.exists():
+        return 0, [(None, 'nie wybrano apteki importowanych osób')]
+    try:
+        rows = read_rows(lines)
+    except ValidationError as e:
+        return 0, [(1, message) for message in e.messages]
+    except UnicodeDecodeError:
+        return 0, [(None, 'plik nie jest zapisany w kodowaniu UTF-8')]
+    if not rows:
+        return 0, [(None, 'plik nie zawiera wierszy z osobami')]
+
+    valid, errors = validate_rows(rows)
+    if errors or dry_run:
+        return 0, errors
+
+    hashes = hash_passwords([row['password'] for row in valid], workers)
+
+    # konta użytkowników zapisywane są w bazie domyślnej, a osoby w bazie apteki (wraz z kopiami kont - klucz
+    # obcy Person.user) - obie w jednej transakcji
+    database = pharmacy.database if pharmacy is not None else DEFAULT_DB_ALIAS
+    with transaction.atomic(using=DEFAULT_DB_ALIAS), transaction.atomic(using=database):
+        users = User.objects.db_manager(DEFAULT_DB_ALIAS).bulk_create([
+            User(username=row['username'], password=password_hash) for row, password_hash in zip(valid, hashes)
+        ])
+        User.groups.through.objects.db_manager(DEFAULT_DB_ALIAS).bulk_create([
+            User.groups.through(user_id=user.id, group_id=group.id)
+            for row, user in zip(valid, users) for group in row['groups']
+        ])
+        if database != DEFAULT_DB_ALIAS:
+            User.objects.db_manager(database).bulk_create([
+                User(id=user.id, username=user.username, password=user.password) for user in users
+            ])
+        Person.all_objects.db_manager(database).bulk_create([
+            Person(user_id=user.id, pharmacy=pharmacy, name=row['name'], title=row['title'])
+            for row, user in zip(valid, users)
+        ])
+        transaction.on_commit(lambda: bump_version('persons'), using=DEFAULT_DB_ALIAS)
+
+    return len(users), errors
@@ -0,0 +1,221 @@
+"""
+Test obciążeniowy - odtwarzanie mieszanki żądań i pomiar opóźnień dla poszczególnych widoków.
+
+Żądania wysyłane są równolegle przez wątki robocze (każdy z własną sesją zalogowanego użytkownika) do
+aplikacji w bieżącym procesie (klient testowy Django) albo do uruchomionego serwera (base_url, np. gunicorn).
+Mieszanka żądań jest syntetyczna (SYNTHETIC_MIX - wagi widoków) albo odtworzona z logu dostępowego.
+
+Formularz edycji wysyłany jest z bieżącymi przypisaniami terminarza, więc test nie zmienia danych - mierzy
+pełną ścieżkę zapisu (odczyt slotów, walidacja) bez modyfikacji terminarzy.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from django.db import close_old_connections, connections
+from django.test import Client
+from django.urls import resolve, reverse, Resolver404
+from schedule.models import Schedule, Shift
+
+import itertools
+import math
+import random
+import re
+import threading
+import time
+import urllib.parse
+
+SYNTHETIC_MIX = (
+    ('login', 5),
+    ('schedule-list', 20),
+    ('schedule-detail', 30),
+    ('schedule-edit', 10),
+    ('schedule-edit-post', 10),
+    ('schedule-checkout', 15),
+    ('print', 10),
+)
+
+LOG_LINE = re.compile(r'(?P<method>GET|POST|HEAD) (?P<path>/\S*)')
+
+PERCENTILES = (50, 95, 99)
+
+
+class LoadTestRequest:
+    def __init__(self, endpoint, method, path, data=None):
+        self.endpoint = endpoint
+        self.method = method
+        self.path = path
+        self.data = data
+
+
+def _edit_data(schedule_id):
+    """
+    Dane formularza edycji terminarza z bieżącymi przypisaniami slotów.
+    """
+    rows = Shift.slots.through.objects.filter(shift__schedule_id=schedule_id).values_list(
+        'slot_id', 'slot__person_id'
+    )
+    return {f'slot_id{slot_id}': str(person_id) if person_id else '---' for slot_id, person_id in rows}
+
+
+class RequestFactory:
+    """
+    Buduje żądania dla nazw widoków. Dane formularzy edycji przygotowywane są raz na terminarz.
+    """
+    def __init__(self, schedule_ids, username, password):
+        self.schedule_ids = schedule_ids
+        self.credentials = {'login': username, 'password': password}
+        self.edit_data = {schedule_id: _edit_data(schedule_id) for schedule_id in schedule_ids}
+
+    def build(self, endpoint, schedule_id=None):
+        schedule_id = schedule_id or random.choice(self.schedule_ids)
+        if endpoint == 'login':
+            return LoadTestRequest(endpoint, 'POST', reverse('login'), self.credentials)
+        if endpoint == 'schedule-list':
+            return LoadTestRequest(endpoint, 'GET', reverse('schedule-list'))
+        if endpoint == 'schedule-edit-post':
+            path = reverse('schedule-edit', kwargs={'schedule_id': schedule_id})
+            return LoadTestRequest(endpoint, 'POST', path, self.edit_data.get(schedule_id) or _edit_data(schedule_id))
+        return LoadTestRequest(endpoint, 'GET', reverse(endpoint, kwargs={'schedule_id': schedule_id}))
+
+    def synthetic(self, count, mix=SYNTHETIC_MIX):
+        endpoints, weights = zip(*mix)
+        return [self.build(endpoint) for endpoint in random.choices(endpoints, weights, k=count)]
+
+    def from_log(self, lines):
+        """
+        Żądania z logu dostępowego (np. gunicorn --access-logfile) albo z pliku z liniami "METODA ŚCIEŻKA".
+        Zapytania POST odtwarzane są tylko dla logowania i edycji terminarza (log nie zawiera ich treści).
+        Zwraca parę (żądania, liczba pominiętych linii).
+        """
+        requests, skipped = [], 0
+        for line in lines:
+            match = LOG_LINE.search(line)
+            if match is None:
+                skipped += 1
+                continue
+            method, path = match['method'], match['path']
+            try:
+                match_url = resolve(urllib.parse.urlsplit(path).path)
+            except Resolver404:
+                skipped += 1
+                continue
+            endpoint = match_url.url_name or path
+            if method == 'POST':
+                if endpoint == 'schedule-edit':
+                    requests.append(self.build('schedule-edit-post', match_url.kwargs['schedule_id']))
+                elif endpoint == 'login':
+                    requests.append(self.build('login'))
+                else:
+                    skipped += 1
+                continue
+            requests.append(LoadTestRequest(endpoint, method, path))
+        return requests, skipped
+
+
+class ClientTransport:
+    """
+    Wysyła żądania do aplikacji w bieżącym procesie przez klienta testowego Django.
+    """
+    def __init__(self, username, password, headers):
+        self.client = Client(raise_request_exception=False, headers=headers)
+        if not self.client.login(username=username, password=password):
+            raise ValueError(f'Nie udało się zalogować jako {username}')
+
+    def send(self, request):
+        method = getattr(self.client, request.method.lower())
+        response = method(request.path, request.data) if request.data is not None else method(request.path)
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        close_old_connections()
+        return response.status_code
+
+
+class HTTPTransport:
+    """
+    Wysyła żądania do uruchomionego serwera (requests.Session z ciasteczkami sesji i CSRF).
+    """
+    def __init__(self, base_url, username, password, headers):
+        import requests
+
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+        self.session.get(self.base_url + reverse('login'))
+        self.send(LoadTestRequest('login', 'POST', reverse('login'), {'login': username, 'password': password}))
+        if 'sessionid' not in self.session.cookies:
+            raise ValueError(f'Nie udało się zalogować jako {username}')
+
+    def send(self, request):
+        data = request.data
+        if request.method == 'POST':
+            data = dict(data or {}, csrfmiddlewaretoken=self.session.cookies.get('csrftoken', ''))
+        response = self.session.request(request.method, self.base_url + request.path, data=data,
+                                        allow_redirects=False)
+        response.content
+        return response.status_code
+
+
+def percentile(values, p):
+    """
+    Percentyl metodą najbliższej pozycji, values - posortowana lista.
+    """
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)] if values else None
+
+
+def run_load_test(requests, transport_factory, concurrency=4):
+    """
+    Wysyła żądania z listy requests w concurrency wątkach, każdy z własnym obiektem transportu
+    (transport_factory()). Zwraca słownik statystyk {widok: {...}} z kluczem 'all' dla wszystkich żądań.
+    """
+    results = []
+    lock = threading.Lock()
+    queue = iter(requests)
+
+    def worker():
+        try:
+            transport = transport_factory()
+            while True:
+                with lock:
+                    request = next(queue, None)
+                if request is None:
+                    break
+                started = time.perf_counter()
+                try:
+                    status = transport.send(request)
+                except Exception:
+                    status = None
+                elapsed = time.perf_counter() - started
+                with lock:
+                    results.append((request.endpoint, elapsed, status))
+        finally:
+            # połączenia z bazą danych są przypisane do wątku - zamykane razem z nim
+            connections.close_all()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    duration = time.perf_counter() - started
+
+    return summarize(results, duration)
+
+
+def summarize(results, duration):
+    stats = {}
+    grouped = itertools.groupby(sorted(results, key=lambda r: r[0]), key=lambda r: r[0])
+    for endpoint, rows in itertools.chain(grouped, [('all', results)]):
+        rows = list(rows)
+        latencies = sorted(elapsed for _, elapsed, _ in rows)
+        errors = sum(1 for _, _, status in rows if status is None or status >= 400)
+        stats[endpoint] = {
+            'requests': len(rows),
+            'errors': errors,
+            'error_rate': errors / len(rows) if rows else 0,
+            'throughput': len(rows) / duration if duration else 0,
+            'mean': sum(latencies) / len(latencies) if latencies else None,
+            **{f'p{p}': percentile(latencies, p) for p in PERCENTILES},
+        }
+    return stats
+
+
+def default_schedule_ids(limit=5):
+    return list(Schedule.objects.order_by('-start_day').values_list('id', flat=True)[:limit])
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+from schedule.models import Pharmacy, Schedule
+from schedule.archiving import archive_schedule, archivable_schedules
+from schedule.deletion import ORPHAN_BATCH_SIZE
+from schedule.tenancy import pharmacy_scope
+
+import datetime
+
+
+class Command(BaseCommand):
+    help = 'Archiwizuje zakończone terminarze do skompresowanych zapisów i usuwa ich sloty.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('schedule_ids', nargs='*', type=int, help='id terminarzy do archiwizacji')
+        parser.add_argument('--before', type=datetime.date.fromisoformat, default=None,
+                            help='archiwizuje terminarze zakończone przed tą datą (domyślnie dzisiaj)')
+        parser.add_argument('--batch-size', type=int, default=ORPHAN_BATCH_SIZE, help='liczba slotów w partii')
+        parser.add_argument('--dry-run', action='store_true', help='tylko lista terminarzy, bez archiwizacji')
+        parser.add_argument('--pharmacy', type=int, help='id apteki - wymagane dla aptek z osobną bazą danych')
+
+    def handle(self, *args, **options):
+        pharmacy = None
+        if options['pharmacy'] is not None:
+            try:
+                pharmacy = Pharmacy.objects.get(id=options['pharmacy'])
+            except Pharmacy.DoesNotExist:
+                raise CommandError(f'Apteka {options["pharmacy"]} nie istnieje')
+
+        with pharmacy_scope(pharmacy):
+            self.archive(options)
+
+    def archive(self, options):
+        if options['schedule_ids']:
+            schedules = Schedule.objects.filter(id__in=options['schedule_ids']).order_by('start_day')
+            unfinished = schedules.filter(end_date__gte=datetime.date.today())
+            if unfinished:
+                raise CommandError(f'Terminarze nie są zakończone: {", ".join(str(s) for s in unfinished)}')
+        else:
+            schedules = archivable_schedules(options['before'] or datetime.date.today())
+
+        for schedule in schedules:
+            if options['dry_run']:
+                self.stdout.write(f'{schedule}')
+                continue
+            deleted = archive_schedule(schedule, batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'{schedule} - zarchiwizowano, usunięto slotów: {deleted}'))
@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+from PharmacySchedule.dbpool import connection_metrics, connection_settings
+from schedule.loadtest import RequestFactory, ClientTransport, run_load_test, default_schedule_ids
+
+import random
+
+SHORT_REQUESTS_MIX = (
+    ('schedule-list', 2),
+    ('schedule-detail', 2),
+    ('schedule-edit-post', 1),
+)
+
+
+class Command(BaseCommand):
+    help = 'Porównuje opóźnienia krótkich żądań (lista, szczegóły, zapis slotów) bez ponownego użycia połączeń ' \
+           'z bazą danych oraz z bieżącą konfiguracją (połączenia trwałe albo pula).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', required=True)
+        parser.add_argument('--password', required=True)
+        parser.add_argument('--requests', type=int, default=200, help='liczba żądań w każdym wariancie')
+        parser.add_argument('--concurrency', type=int, default=1, help='liczba równoległych wątków')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        schedule_ids = default_schedule_ids()
+        if not schedule_ids:
+            raise CommandError('Brak terminarzy do testu')
+
+        random.seed(0)
+        factory = RequestFactory(schedule_ids, options['username'], options['password'])
+        requests = factory.synthetic(options['requests'], SHORT_REQUESTS_MIX)
+        headers = {'Accept-Encoding': 'gzip'}
+
+        def transport_factory():
+            return ClientTransport(options['username'], options['password'], headers)
+
+        configured = connection_metrics()['databases'][options['database']]
+        variants = (
+            ('nowe połączenie na żądanie', {'conn_max_age': 0, 'pool': False}),
+            (f'konfiguracja ({configured["mode"]})', {'conn_max_age': configured['conn_max_age'], 'pool': True}),
+        )
+
+        results = []
+        for label, variant in variants:
+            with connection_settings(options['database'], **variant):
+                opened = connection_metrics()['databases'][options['database']]['opened']
+                try:
+                    stats = run_load_test(requests, transport_factory, options['concurrency'])['all']
+                except ValueError as e:
+                    raise CommandError(e)
+                metrics = connection_metrics()['databases'][options['database']]
+            results.append(stats)
+            self.stdout.write(
+                f'{label:>36}: średnio {stats["mean"] * 1000:7.2f} ms, p50 {stats["p50"] * 1000:7.2f} ms, '
+                f'p95 {stats["p95"] * 1000:7.2f} ms, {stats["throughput"]:7.1f} req/s, '
+                f'otwartych połączeń {metrics["opened"] - opened}, błędy {stats["errors"]}'
+            )
+            if metrics['mode'] == 'pool':
+                self.stdout.write(f'{"":>36}  pula: średnie oczekiwanie {metrics["avg_wait_ms"]:.2f} ms, '
+                                  f'rozmiar {metrics["pool_size"]}/{metrics["pool_max"]}')
+
+        before, after = results
+        self.stdout.write(self.style.SUCCESS(
+            f'Zmiana średniego opóźnienia: {(after["mean"] - before["mean"]) * 1000:+.2f} ms na żądanie'
+        ))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from schedule.startup import measure_startup, STARTUP_TARGET
+
+import statistics
+
+
+class Command(BaseCommand):
+    help = 'Mierzy czas startu procesu aplikacji oraz zużycie pamięci - bez i z importem ciężkich modułów.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', default=STARTUP_TARGET, help=f'importowany moduł (domyślnie {STARTUP_TARGET})')
+        parser.add_argument('--runs', type=int, default=5, help='liczba pomiarów dla każdego wariantu')
+
+    def handle(self, *args, **options):
+        results = {}
+        for label, preload in (('leniwe ładowanie', False), ('PRELOAD_HEAVY_MODULES', True)):
+            runs = [measure_startup(options['target'], preload) for _ in range(options['runs'])]
+            seconds = [run['seconds'] for run in runs]
+            rss = statistics.median(run['maxrss_kb'] for run in runs)
+            results[label] = (statistics.median(seconds), rss)
+            self.stdout.write(
+                f'{label:>22}: mediana {statistics.median(seconds) * 1000:7.1f} ms, '
+                f'min {min(seconds) * 1000:7.1f} ms, RSS {rss / 1024:6.1f} MB, modułów {runs[-1]["modules"]}'
+            )
+
+        (lazy_seconds, lazy_rss), (eager_seconds, eager_rss) = results.values()
+        self.stdout.write(self.style.SUCCESS(
+            f'Oszczędność przy leniwym ładowaniu: {(eager_seconds - lazy_seconds) * 1000:.1f} ms, '
+            f'{(eager_rss - lazy_rss) / 1024:.1f} MB na proces'
+        ))
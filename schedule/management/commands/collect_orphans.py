@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from schedule.models import Pharmacy, Schedule
+from schedule.deletion import collect_orphans, ORPHAN_BATCH_SIZE
+from schedule.tenancy import pharmacy_scope
+
+
+class Command(BaseCommand):
+    help = 'Wyszukuje i usuwa osierocone sloty (bez zmiany lub z datą spoza zakresu terminarza) wraz z wierszami ' \
+           'tabeli pośredniej.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schedule', type=int, help='id terminarza, do którego ograniczone jest sprzątanie')
+        parser.add_argument('--batch-size', type=int, default=ORPHAN_BATCH_SIZE, help='liczba slotów w partii')
+        parser.add_argument('--dry-run', action='store_true', help='tylko raport, bez usuwania')
+        parser.add_argument('--pharmacy', type=int, help='id apteki - wymagane dla aptek z osobną bazą danych')
+
+    def handle(self, *args, **options):
+        pharmacy = None
+        if options['pharmacy'] is not None:
+            try:
+                pharmacy = Pharmacy.objects.get(id=options['pharmacy'])
+            except Pharmacy.DoesNotExist:
+                raise CommandError(f'Apteka {options["pharmacy"]} nie istnieje')
+
+        with pharmacy_scope(pharmacy):
+            self.collect(options)
+
+    def collect(self, options):
+        schedule = None
+        if options['schedule'] is not None:
+            try:
+                schedule = Schedule.objects.get(id=options['schedule'])
+            except Schedule.DoesNotExist:
+                raise CommandError(f'Terminarz {options["schedule"]} nie istnieje')
+
+        report = collect_orphans(schedule, batch_size=options['batch_size'], dry_run=options['dry_run'])
+
+        self.stdout.write(f'Sloty bez zmiany: {report["unattached"]}')
+        self.stdout.write(f'Sloty spoza zakresu terminarza: {report["out_of_range"]}')
+        if options['dry_run']:
+            self.stdout.write('Tryb dry-run - nic nie zostało usunięte')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Usunięto slotów: {report["deleted"]}'))
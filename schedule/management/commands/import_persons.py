@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from schedule.importing import import_persons
+from schedule.models import Pharmacy
+
+
+class Command(BaseCommand):
+    help = 'Importuje osoby z pliku CSV (kolumny: username, password, name, title, groups), hashując hasła ' \
+           'równolegle w puli procesów.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='ścieżka do pliku CSV')
+        parser.add_argument('--workers', type=int, default=None, help='liczba procesów, domyślnie liczba rdzeni')
+        parser.add_argument('--dry-run', action='store_true', help='tylko walidacja, bez zapisu')
+        parser.add_argument('--pharmacy', type=int, help='id apteki, do której należą importowane osoby')
+
+    def handle(self, *args, **options):
+        pharmacy = None
+        if options['pharmacy'] is not None:
+            try:
+                pharmacy = Pharmacy.objects.get(id=options['pharmacy'])
+            except Pharmacy.DoesNotExist:
+                raise CommandError(f'Apteka {options["pharmacy"]} nie istnieje')
+
+        with open(options['path'], encoding='utf-8-sig', newline='') as lines:
+            created, errors = import_persons(lines, workers=options['workers'], dry_run=options['dry_run'],
+                                             pharmacy=pharmacy)
+
+        for line, message in errors:
+            self.stderr.write(f'Wiersz {line}: {message}' if line else message)
+        if errors:
+            raise CommandError(f'Plik zawiera błędy ({len(errors)}) - nic nie zostało zapisane')
+
+        if options['dry_run']:
+            self.stdout.write('Plik nie zawiera błędów')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Utworzono osób: {created}'))
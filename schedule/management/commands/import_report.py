@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from schedule.startup import import_times, STARTUP_TARGET
+
+
+class Command(BaseCommand):
+    help = 'Raport czasu importu modułów przy starcie aplikacji i ładowaniu URLconf ' \
+           '(python -X importtime w osobnym procesie).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', default=STARTUP_TARGET, help=f'importowany moduł (domyślnie {STARTUP_TARGET})')
+        parser.add_argument('--limit', type=int, default=25, help='liczba wyświetlanych modułów')
+        parser.add_argument('--prefix', default='', help='tylko moduły o podanym prefiksie, np. schedule')
+        parser.add_argument('--preload', action='store_true', help='z włączonym PRELOAD_HEAVY_MODULES')
+
+    def handle(self, *args, **options):
+        times, heavy = import_times(options['target'], options['preload'])
+        total = sum(cumulative for _, _, cumulative, top_level in times if top_level)
+
+        self.stdout.write(f'{"łącznie [ms]":>12} {"własny [ms]":>12}  moduł')
+        shown = [t for t in times if t[0].startswith(options['prefix'])][:options['limit']]
+        for module, self_us, cumulative_us, _ in shown:
+            self.stdout.write(f'{cumulative_us / 1000:12.1f} {self_us / 1000:12.1f}  {module}')
+
+        self.stdout.write(f'\nModułów: {len(times)}, łączny czas importów: {total / 1000:.1f} ms')
+        if heavy:
+            self.stdout.write(self.style.WARNING(f'Załadowane ciężkie moduły: {", ".join(heavy)}'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Ciężkie moduły nie są ładowane przy starcie'))
@@ -0,0 +1,75 @@
+from django.core.management.base import BaseCommand, CommandError
+from PharmacySchedule.dbpool import connection_metrics
+from schedule.loadtest import RequestFactory, ClientTransport, HTTPTransport, run_load_test, default_schedule_ids, \
+    PERCENTILES
+
+import json
+import random
+
+
+class Command(BaseCommand):
+    help = 'Test obciążeniowy: odtwarza mieszankę żądań (logowanie, lista i szczegóły terminarzy, edycja, ' \
+           'sprawdzenie, wydruk PDF) i raportuje opóźnienia p50/p95/p99, przepustowość i odsetek błędów.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', required=True, help='użytkownik z uprawnieniami do edycji terminarzy')
+        parser.add_argument('--password', required=True)
+        parser.add_argument('--url', default=None,
+                            help='adres uruchomionego serwera, np. http://127.0.0.1:8000 (domyślnie klient testowy '
+                                 'Django w bieżącym procesie)')
+        parser.add_argument('--requests', type=int, default=200, help='liczba żądań mieszanki syntetycznej')
+        parser.add_argument('--concurrency', type=int, default=4, help='liczba równoległych wątków')
+        parser.add_argument('--replay', default=None, help='log dostępowy do odtworzenia zamiast mieszanki')
+        parser.add_argument('--schedules', default=None, help='id terminarzy oddzielone przecinkami '
+                                                                '(domyślnie 5 najnowszych)')
+        parser.add_argument('--accept-encoding', default='gzip, br', help='nagłówek Accept-Encoding żądań')
+        parser.add_argument('--seed', type=int, default=None, help='ziarno losowania mieszanki')
+        parser.add_argument('--json', default=None, help='zapisuje statystyki do pliku JSON (porównywanie przebiegów)')
+
+    def handle(self, *args, **options):
+        if options['seed'] is not None:
+            random.seed(options['seed'])
+
+        if options['schedules']:
+            schedule_ids = [int(i) for i in options['schedules'].split(',')]
+        else:
+            schedule_ids = default_schedule_ids()
+        if not schedule_ids:
+            raise CommandError('Brak terminarzy do testu')
+
+        factory = RequestFactory(schedule_ids, options['username'], options['password'])
+        if options['replay']:
+            with open(options['replay'], encoding='utf-8') as lines:
+                requests, skipped = factory.from_log(lines)
+            if skipped:
+                self.stderr.write(f'Pominięto linii logu: {skipped}')
+        else:
+            requests = factory.synthetic(options['requests'])
+        if not requests:
+            raise CommandError('Brak żądań do wysłania')
+
+        headers = {'Accept-Encoding': options['accept_encoding']}
+        if options['url']:
+            def transport_factory():
+                return HTTPTransport(options['url'], options['username'], options['password'], headers)
+        else:
+            def transport_factory():
+                return ClientTransport(options['username'], options['password'], headers)
+
+        try:
+            stats = run_load_test(requests, transport_factory, options['concurrency'])
+        except ValueError as e:
+            raise CommandError(e)
+
+        columns = ''.join(f'{f"p{p} [ms]":>10}' for p in PERCENTILES)
+        self.stdout.write(f'{"widok":<22}{"żądań":>7}{"błędy":>8}{"req/s":>9}{columns}')
+        for endpoint, row in stats.items():
+            values = ''.join(f'{row[f"p{p}"] * 1000:10.1f}' for p in PERCENTILES)
+            line = f'{endpoint:<22}{row["requests"]:>7}{row["error_rate"]:>8.1%}{row["throughput"]:>9.1f}{values}'
+            self.stdout.write(self.style.ERROR(line) if row['errors'] else line)
+
+        if options['json']:
+            with open(options['json'], 'w', encoding='utf-8') as dest:
+                json.dump({'options': {key: options[key] for key in ('url', 'concurrency', 'replay', 'requests')},
+                           'stats': stats,
+                           'connections': None if options['url'] else connection_metrics()}, dest, indent=2)
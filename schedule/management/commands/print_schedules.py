@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from schedule.models import Schedule
+from schedule.printing import render_batch
+
+import datetime
+
+
+class Command(BaseCommand):
+    help = 'Drukuje wiele terminarzy do jednego pliku PDF, renderując je równolegle w puli procesów.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('schedule_ids', nargs='*', type=int, help='id terminarzy do wydruku')
+        parser.add_argument('--start', type=datetime.date.fromisoformat, help='początek zakresu dat (RRRR-MM-DD)')
+        parser.add_argument('--end', type=datetime.date.fromisoformat, help='koniec zakresu dat (RRRR-MM-DD)')
+        parser.add_argument('--output', '-o', default='schedules.pdf', help='plik wynikowy')
+        parser.add_argument('--workers', type=int, default=None, help='liczba procesów, domyślnie liczba rdzeni')
+
+    def handle(self, *args, **options):
+        if options['schedule_ids']:
+            schedules = Schedule.objects.filter(id__in=options['schedule_ids'])
+        elif options['start'] and options['end']:
+            schedules = Schedule.objects.filter(start_day__lte=options['end'], end_date__gte=options['start'])
+        else:
+            raise CommandError('Podaj id terminarzy albo zakres dat --start i --end')
+
+        schedules = list(schedules.order_by('start_day', 'id'))
+        if not schedules:
+            raise CommandError('Nie znaleziono terminarzy')
+
+        started = datetime.datetime.now()
+        with open(options['output'], 'wb') as dest:
+            render_batch(schedules, dest, workers=options['workers'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Zapisano {len(schedules)} terminarzy do {options["output"]} '
+            f'w {(datetime.datetime.now() - started).total_seconds():.1f} s'
+        ))
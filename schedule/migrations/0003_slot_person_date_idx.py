@@ -0,0 +1,17 @@
+# Generated by Django 5.1.6 on 2026-10-19 18:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedule', '0002_person_user'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='slot',
+            index=models.Index(fields=['person', 'date'], name='slot_person_date_idx'),
+        ),
+    ]
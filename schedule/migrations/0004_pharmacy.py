@@ -0,0 +1,68 @@
+# Generated by Django 5.1.6 on 2026-10-19 18:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def assign_default_pharmacy(apps, schema_editor):
+    Pharmacy = apps.get_model('schedule', 'Pharmacy')
+    models_ = [apps.get_model('schedule', name) for name in ('Person', 'Schedule', 'Shift')]
+    db = schema_editor.connection.alias
+
+    if not any(model.objects.using(db).exists() for model in models_):
+        return
+
+    pharmacy = Pharmacy.objects.using(db).create(name='Apteka')
+    for model in models_:
+        model.objects.using(db).filter(pharmacy__isnull=True).update(pharmacy=pharmacy)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedule', '0003_slot_person_date_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Pharmacy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64)),
+                ('database', models.CharField(default='default', max_length=32)),
+            ],
+            options={
+                'verbose_name_plural': 'pharmacies',
+            },
+        ),
+        migrations.AddField(
+            model_name='person',
+            name='pharmacy',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, to='schedule.pharmacy'),
+        ),
+        migrations.AddField(
+            model_name='schedule',
+            name='pharmacy',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, to='schedule.pharmacy'),
+        ),
+        migrations.AddField(
+            model_name='shift',
+            name='pharmacy',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, to='schedule.pharmacy'),
+        ),
+        migrations.AddIndex(
+            model_name='person',
+            index=models.Index(fields=['pharmacy', 'name'], name='person_pharmacy_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='schedule',
+            index=models.Index(fields=['pharmacy', 'start_day'], name='schedule_pharmacy_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shift',
+            index=models.Index(fields=['pharmacy', 'schedule'], name='shift_pharmacy_schedule_idx'),
+        ),
+        migrations.RunPython(assign_default_pharmacy, migrations.RunPython.noop),
+    ]
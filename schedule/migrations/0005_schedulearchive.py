@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-19 18:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedule', '0004_pharmacy'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduleArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('data', models.BinaryField()),
+                ('schedule', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='archive', to='schedule.schedule')),
+            ],
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.6 on 2026-10-19 18:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedule', '0007_assignmentlog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Leave',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('leave_type', models.CharField(choices=[('Urlop', 'Urlop'), ('L4', 'Zwolnienie lekarskie'), ('Niedostępność', 'Niedostępność')], default='Urlop', max_length=16)),
+                ('person', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaves', to='schedule.person')),
+                ('pharmacy', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, to='schedule.pharmacy')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['pharmacy', 'start_date', 'end_date'], name='leave_pharmacy_range_idx'), models.Index(fields=['person', 'start_date', 'end_date'], name='leave_person_range_idx')],
+                'constraints': [models.CheckConstraint(condition=models.Q(('end_date__gte', models.F('start_date'))), name='leave_range_valid')],
+            },
+        ),
+    ]
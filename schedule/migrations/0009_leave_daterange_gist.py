@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+def create_gist_index(apps, schema_editor):
+    # indeks GiST po zakresie dat nieobecności - zapytania o nakładanie się okresów (PostgreSQL)
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE INDEX leave_daterange_gist ON schedule_leave USING gist (daterange(start_date, end_date, '[]'))"
+        )
+
+
+def drop_gist_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS leave_daterange_gist')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedule', '0008_leave'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_gist_index, drop_gist_index),
+    ]
@@ -1,7 +1,11 @@
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import models, router, transaction
 from django.contrib.auth.models import User
+from schedule.tenancy import TenantManager, get_current_pharmacy, NO_PHARMACY
 
 import datetime
+import json
+import zlib
 
 
 SHIFT_TYPES = (
@@ -14,8 +18,46 @@ TITLE_CHOICES = (
     ('Technik', 'Tech.')
 )
 
+DAYS = ('pn', 'wt', 'śr', 'cz', 'pt', 'sb', 'nd')
 
-class Person(models.Model):
+
+class Pharmacy(models.Model):
+    """
+    Model apteki - właściciel terminarzy, zmian oraz osób
+    name - nazwa apteki
+    database - alias bazy danych, w której przechowywane są dane apteki
+    """
+    name = models.CharField(max_length=64)
+    database = models.CharField(max_length=32, default='default')
+
+    class Meta:
+        verbose_name_plural = 'pharmacies'
+
+    def __str__(self):
+        return f'{self.name}'
+
+
+class TenantModel(models.Model):
+    """
+    Model należący do apteki. Domyślny manager ogranicza zapytania do apteki bieżącego żądania,
+    a all_objects zwraca dane wszystkich aptek.
+    """
+    pharmacy = models.ForeignKey(Pharmacy, on_delete=models.PROTECT, blank=True, null=True)
+
+    objects = TenantManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        pharmacy = get_current_pharmacy()
+        if self.pharmacy_id is None and pharmacy is not NO_PHARMACY:
+            self.pharmacy = pharmacy
+        super().save(*args, **kwargs)
+
+
+class Person(TenantModel):
     """
     Model osoby
     user - pole opisujące relację 1 do 1 z użytkownikiem
@@ -26,10 +68,45 @@ class Person(models.Model):
     name = models.CharField(max_length=32)
     title = models.CharField(max_length=32, choices=TITLE_CHOICES)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['pharmacy', 'name'], name='person_pharmacy_name_idx'),
+        ]
+
     def __str__(self):
         return f'{self.name}'
 
 
+LEAVE_TYPES = (
+    ('Urlop', 'Urlop'),
+    ('L4', 'Zwolnienie lekarskie'),
+    ('Niedostępność', 'Niedostępność'),
+)
+
+
+class Leave(TenantModel):
+    """
+    Okres niedostępności osoby (urlop, zwolnienie, inna nieobecność)
+    start_date, end_date - pierwszy i ostatni dzień nieobecności (włącznie)
+    """
+    person = models.ForeignKey(Person, on_delete=models.CASCADE, related_name='leaves')
+    start_date = models.DateField()
+    end_date = models.DateField()
+    leave_type = models.CharField(max_length=16, choices=LEAVE_TYPES, default='Urlop')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['pharmacy', 'start_date', 'end_date'], name='leave_pharmacy_range_idx'),
+            models.Index(fields=['person', 'start_date', 'end_date'], name='leave_person_range_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(condition=models.Q(end_date__gte=models.F('start_date')), name='leave_range_valid'),
+        ]
+
+    def __str__(self):
+        return f'{self.person} | {self.get_leave_type_display()} {self.start_date} - {self.end_date}'
+
+
 class Slot(models.Model):
     """
     Przechowuje informację o przypisaniu osoby do odpowieniego dnia
@@ -37,11 +114,33 @@ class Slot(models.Model):
     date = models.DateField()
     person = models.ForeignKey(Person, on_delete=models.PROTECT, blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['person', 'date'], name='slot_person_date_idx'),
+        ]
+
     def __str__(self):
         return f'{self.date} | {self.person}'
 
+    def clean(self):
+        """
+        Odrzuca przypisanie osoby, która w dniu slotu jest nieobecna (formularze, panel administracyjny).
+        Widok edycji terminarza sprawdza przypisania zbiorczo (schedule.availability.find_conflicts).
+        """
+        if self.person_id is not None and self.person_id != getattr(self, 'loaded_person_id', None):
+            from schedule.availability import find_conflicts
+            if find_conflicts([self]):
+                raise ValidationError({'person': f'{self.person} jest nieobecny(a) w dniu {self.date}'})
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # zapamiętanie osoby przypisanej w momencie odczytu - potrzebne do unieważniania cache poprzedniej osoby
+        instance = super().from_db(db, field_names, values)
+        instance.loaded_person_id = instance.__dict__.get('person_id')
+        return instance
+
 
-class Schedule(models.Model):
+class Schedule(TenantModel):
     """
     Model terminarza
     name - nazwa terminarza
@@ -49,18 +148,22 @@ class Schedule(models.Model):
     end_date - data końcowa terminarza
 
     check_correctness() - sprawdza obecność błędów w terminarzu
+    get_days() - zwraca listę dni terminarza
+    get_grid() - zwraca zmiany oraz wiersze tabeli terminarza, uzupełniając brakujące sloty
     """
     name = models.CharField(max_length=32)
     start_day = models.DateField(blank=True)
     end_date = models.DateField(blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['pharmacy', 'start_day'], name='schedule_pharmacy_start_idx'),
+        ]
+
     def __str__(self):
         return f'{self.name} {self.start_day} - {self.end_date}'
 
-    def check_correctness(self):
-        warnings = []
-        shifts = Shift.objects.filter(schedule=self)
-
+    def get_days(self):
         day = self.start_day
         days = [day]
 
@@ -68,6 +171,99 @@ class Schedule(models.Model):
             day += datetime.timedelta(days=1)
             days.append(day)
 
+        return days
+
+    def get_ordered_shifts(self):
+        """
+        Zmiany terminarza w kolejności kolumn tabeli - pierwsza zmiana główna, następnie pozostałe zmiany,
+        na końcu kolejne zmiany główne.
+        """
+        shifts = Shift.objects.filter(schedule=self).order_by('start_hour')
+
+        temp_shifts = []
+        main_shifts = []
+
+        for s in shifts:
+            if s.shift_type == 'Main':
+                main_shifts.append(s)
+            else:
+                temp_shifts.append(s)
+
+        for num in range(len(main_shifts)):
+            if num == 0:
+                temp_shifts.insert(num, main_shifts[num])
+            else:
+                temp_shifts.append(main_shifts[num])
+
+        return temp_shifts
+
+    def fill_slots(self, shifts, days):
+        """
+        Tworzy brakujące sloty tak, aby każda zmiana miała w każdym dniu tyle slotów ile wynosi jej pojemność.
+        """
+        if not self._missing_slots(shifts, days):
+            return
+
+        # odczyt mógł trafić do opóźnionej repliki - liczby slotów sprawdzane są ponownie w transakcji bazy,
+        # do której trafi zapis (wewnątrz transakcji ReplicaRouter kieruje odczyty do bazy głównej)
+        with transaction.atomic(using=router.db_for_write(Slot, instance=self)):
+            list(Shift.objects.select_for_update().filter(id__in=[s.id for s in shifts]))
+            for s, d, count in self._missing_slots(shifts, days):
+                for _ in range(count):
+                    slot = Slot.objects.create(date=d)
+                    s.slots.add(slot)
+
+    def _missing_slots(self, shifts, days):
+        """
+        Lista trójek (zmiana, dzień, liczba brakujących slotów).
+        """
+        missing = []
+        for s in shifts:
+            slot_counts = {}
+            for date in s.slots.values_list('date', flat=True):
+                slot_counts[date] = slot_counts.get(date, 0) + 1
+
+            for d in days:
+                if slot_counts.get(d, 0) < s.capacity:
+                    missing.append((s, d, s.capacity - slot_counts.get(d, 0)))
+        return missing
+
+    def get_grid(self):
+        """
+        Zwraca parę (shifts, data), gdzie data to wiersze tabeli: dzień miesiąca, dzień tygodnia oraz osoby
+        przypisane do kolejnych slotów ('-------' dla pustych slotów).
+        """
+        shifts = self.get_ordered_shifts()
+        days = self.get_days()
+        self.fill_slots(shifts, days)
+
+        slots = {}
+        for s in shifts:
+            for slot in s.slots.select_related('person').order_by('id'):
+                slots.setdefault((s.id, slot.date), []).append(slot)
+
+        data = []
+        for d in days:
+            row = [str(d.day), DAYS[d.isoweekday() - 1]]
+            for s in shifts:
+                for slot in slots.get((s.id, d), []):
+                    row.append(slot.person) if slot.person else row.append('-------')
+            data.append(row)
+
+        return shifts, data
+
+    def check_correctness(self):
+        from schedule.availability import find_conflicts
+
+        warnings = []
+        shifts = Shift.objects.filter(schedule=self)
+        days = self.get_days()
+
+        slots = Slot.objects.filter(shift__schedule=self, person__isnull=False).select_related('person') \
+            .order_by('date')
+        for slot in find_conflicts(slots):
+            warnings.append(f'{slot.date} - {slot.person} jest przypisany(a) do zmiany w czasie nieobecności')
+
         for d in days:
             for s in shifts:
                 slots = s.slots.filter(date=d)
@@ -82,7 +278,7 @@ class Schedule(models.Model):
         return warnings
 
 
-class Shift(models.Model):
+class Shift(TenantModel):
     """
     Model zmiany przechowujący informacje o przynależności do odpowiedniego terminarza, nazwę zmiany, godzinach
     pracy, pojemności[ilości slotów] oraz slotach przypisanych do tej zmiany.
@@ -95,5 +291,84 @@ class Shift(models.Model):
     capacity = models.IntegerField(default=3)
     slots = models.ManyToManyField(Slot, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['pharmacy', 'schedule'], name='shift_pharmacy_schedule_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.pharmacy_id is None and self.schedule_id is not None:
+            self.pharmacy_id = self.schedule.pharmacy_id
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f'{self.start_hour} - {self.end_hour}'
+
+
+class ScheduleArchive(models.Model):
+    """
+    Archiwum zakończonego terminarza - skompresowany zapis (JSON + zlib) zmian, tabeli terminarza oraz nazw
+    przypisanych osób z chwili archiwizacji. Po archiwizacji sloty terminarza są usuwane.
+    """
+    schedule = models.OneToOneField(Schedule, on_delete=models.CASCADE, related_name='archive')
+    archived_at = models.DateTimeField(auto_now_add=True)
+    data = models.BinaryField()
+
+    def __str__(self):
+        return f'{self.schedule} (archiwum)'
+
+    def set_snapshot(self, snapshot):
+        self.data = zlib.compress(json.dumps(snapshot, separators=(',', ':')).encode('utf-8'), 9)
+
+    def get_snapshot(self):
+        return json.loads(zlib.decompress(bytes(self.data)).decode('utf-8'))
+
+
+class PublishedSchedule(models.Model):
+    """
+    Opublikowana wersja terminarza - zdenormalizowany zapis JSON (w tym samym formacie co archiwum) budowany
+    przy publikacji. Widok, wydruk i eksport opublikowanego terminarza korzystają wyłącznie z tego wiersza,
+    a zmiany w slotach są widoczne dopiero po ponownej publikacji.
+    """
+    schedule = models.OneToOneField(Schedule, on_delete=models.CASCADE, related_name='published')
+    published_at = models.DateTimeField(auto_now=True)
+    published_by = models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True)
+    data = models.JSONField()
+
+    def __str__(self):
+        return f'{self.schedule} (opublikowany {self.published_at:%Y-%m-%d %H:%M})'
+
+    def get_snapshot(self):
+        return self.data
+
+
+class AssignmentLog(models.Model):
+    """
+    Dziennik zmian przypisań osób do slotów (tylko dopisywanie).
+    Powiązania nie mają więzów w bazie danych, aby historia przetrwała usunięcie slotów, osób i terminarzy.
+    """
+    schedule = models.ForeignKey(Schedule, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False,
+                                 blank=True, null=True, related_name='+')
+    slot = models.ForeignKey(Slot, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False,
+                             related_name='+')
+    date = models.DateField()
+    old_person = models.ForeignKey(Person, on_delete=models.DO_NOTHING, db_constraint=False, blank=True, null=True,
+                                   related_name='+')
+    new_person = models.ForeignKey(Person, on_delete=models.DO_NOTHING, db_constraint=False, blank=True, null=True,
+                                   related_name='+')
+    user = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, blank=True,
+                             null=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['schedule', 'created_at'], name='assignmentlog_schedule_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.created_at} | {self.date} | {self.old_person} -> {self.new_person}'
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('Wpisy dziennika zmian nie mogą być modyfikowane')
+        super().save(*args, **kwargs)
@@ -0,0 +1,68 @@
+"""
+Generowanie wydruków PDF terminarzy.
+
+Dane terminarzy pobierane są w procesie głównym, a renderowanie HTML do PDF (najbardziej kosztowny etap)
+odbywa się równolegle w puli procesów. Wyniki są łączone w jeden plik przy pomocy pypdf.
+
+xhtml2pdf (wraz z reportlab, html5lib, Pillow) oraz pypdf importowane są przy pierwszym użyciu, aby nie
+spowalniać startu procesów, które nie generują wydruków (schedule.startup).
+"""
+from concurrent.futures import ProcessPoolExecutor
+from django.template.loader import get_template
+from schedule.snapshots import get_schedule_grid
+
+import io
+import os
+
+PRINT_TEMPLATE = 'schedule/print.html'
+
+
+class PDFRenderError(Exception):
+    pass
+
+
+def render_schedule_html(schedule, request=None):
+    shifts, data = get_schedule_grid(schedule)
+    context = {'schedule': schedule, 'shifts': shifts, 'data': data, 'request': request}
+    return get_template(PRINT_TEMPLATE).render(context)
+
+
+def render_pdf(html):
+    """
+    Renderuje dokument HTML do PDF i zwraca jego zawartość. Funkcja musi być dostępna na poziomie modułu,
+    aby mogła być wywoływana w procesach puli.
+    """
+    from xhtml2pdf import pisa
+
+    result = io.BytesIO()
+    pisa_status = pisa.CreatePDF(html, dest=result, encoding='UTF-8')
+    if pisa_status.err:
+        raise PDFRenderError(html)
+    return result.getvalue()
+
+
+def merge_pdfs(documents, dest):
+    from pypdf import PdfReader, PdfWriter
+
+    writer = PdfWriter()
+    for document in documents:
+        writer.append(PdfReader(io.BytesIO(document)))
+    writer.write(dest)
+
+
+def render_batch(schedules, dest, request=None, workers=None):
+    """
+    Renderuje wydruki podanych terminarzy równolegle i zapisuje je do dest jako jeden plik PDF
+    (w kolejności terminarzy).
+    workers - liczba procesów, domyślnie liczba rdzeni
+    """
+    htmls = [render_schedule_html(schedule, request) for schedule in schedules]
+    workers = min(workers or os.cpu_count() or 1, len(htmls))
+
+    if workers <= 1:
+        documents = [render_pdf(html) for html in htmls]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            documents = list(executor.map(render_pdf, htmls))
+
+    merge_pdfs(documents, dest)
@@ -0,0 +1,72 @@
+from django.contrib.auth.models import Group, User
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
+from django.dispatch import receiver
+from schedule.models import Pharmacy, Person, Schedule, Shift, Slot, ScheduleArchive, PublishedSchedule
+from schedule.ical import invalidate_feed
+from schedule.caching import bump_version
+from schedule.audit import record_change
+from schedule.tenancy import copy_to_database
+
+
+@receiver(post_save, sender=Slot)
+def slot_saved(sender, instance, **kwargs):
+    loaded_person_id = getattr(instance, 'loaded_person_id', None)
+    if loaded_person_id != instance.person_id:
+        record_change(instance, loaded_person_id, instance.person_id)
+    invalidate_feed(instance.person_id, loaded_person_id)
+    instance.loaded_person_id = instance.person_id
+
+
+@receiver(post_save, sender=Shift)
+@receiver(pre_delete, sender=Shift)
+def shift_changed(sender, instance, **kwargs):
+    if instance.pk:
+        invalidate_feed(*instance.slots.exclude(person=None).values_list('person_id', flat=True))
+
+
+@receiver(post_save, sender=Pharmacy)
+def pharmacy_saved(sender, instance, using, **kwargs):
+    # dane apteki z osobną bazą danych wskazują na aptekę kluczem obcym
+    if instance.database != using:
+        copy_to_database(instance, instance.database)
+
+
+@receiver(pre_save, sender=Person)
+def person_saving(sender, instance, using, **kwargs):
+    # klucz obcy Person.user w bazie apteki wskazuje na kopię konta z bazy domyślnej
+    if using != DEFAULT_DB_ALIAS and instance.user_id is not None:
+        copy_to_database(User.objects.using(DEFAULT_DB_ALIAS).get(id=instance.user_id), using)
+
+
+def _bump_on_commit(namespace, using):
+    # transakcja zapisu trwa w bazie, do której trafił obiekt (baza apteki albo domyślna)
+    transaction.on_commit(lambda: bump_version(namespace), using=using)
+
+
+@receiver(post_save, sender=Person)
+@receiver(post_delete, sender=Person)
+@receiver(post_save, sender=Pharmacy)
+@receiver(post_delete, sender=Pharmacy)
+def person_changed(sender, using, **kwargs):
+    _bump_on_commit('persons', using)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, using, **kwargs):
+    _bump_on_commit('groups', using)
+
+
+@receiver(post_save, sender=Schedule)
+@receiver(post_delete, sender=Schedule)
+def schedule_changed(sender, using, **kwargs):
+    _bump_on_commit('schedules', using)
+
+
+@receiver(post_save, sender=ScheduleArchive)
+@receiver(post_delete, sender=ScheduleArchive)
+@receiver(post_save, sender=PublishedSchedule)
+@receiver(post_delete, sender=PublishedSchedule)
+def snapshot_changed(sender, using, **kwargs):
+    _bump_on_commit('snapshots', using)
@@ -0,0 +1,158 @@
+"""
+Zapisy (snapshoty) terminarzy - wspólny format archiwów i opublikowanych terminarzy.
+
+Zapis to słownik JSON z nazwą i zakresem dat terminarza, zmianami w kolejności kolumn tabeli oraz slotami
+(kolumna, nazwa osoby, tytuł, id użytkownika, id osoby, id slotu) pogrupowanymi po dniach. Z zapisu odtwarzana
+jest tabela terminarza, wiersze eksportu oraz wydarzenia kanałów kalendarzy osób bez zapytań do tabel Shift,
+Slot i Person.
+"""
+from django.db import router, transaction
+from schedule.models import Person, Schedule, PublishedSchedule, Shift, DAYS
+from schedule.caching import cached
+from schedule.tenancy import current_database
+
+import datetime
+
+SNAPSHOT_VERSION = 1
+
+
+def build_snapshot(schedule):
+    shifts = schedule.get_ordered_shifts()
+    days = schedule.get_days()
+    schedule.fill_slots(shifts, days)
+
+    columns = {s.id: num for num, s in enumerate(shifts)}
+    slots = {}
+    rows = Shift.slots.through.objects.filter(shift__schedule=schedule).order_by('slot_id').values_list(
+        'shift_id', 'slot__date', 'slot__person__name', 'slot__person__title', 'slot__person__user_id',
+        'slot__person_id', 'slot_id'
+    )
+    for shift_id, date, name, title, user_id, person_id, slot_id in rows:
+        slots.setdefault(date.isoformat(), []).append([columns[shift_id], name, title, user_id, person_id, slot_id])
+
+    return {
+        'version': SNAPSHOT_VERSION,
+        'name': schedule.name,
+        'start_day': schedule.start_day.isoformat(),
+        'end_date': schedule.end_date.isoformat(),
+        'shifts': [
+            {
+                'id': s.id,
+                'name': s.name,
+                'shift_type': s.shift_type,
+                'start_hour': s.start_hour.isoformat() if s.start_hour else None,
+                'end_hour': s.end_hour.isoformat() if s.end_hour else None,
+                'capacity': s.capacity,
+            }
+            for s in shifts
+        ],
+        'slots': slots,
+    }
+
+
+def _time(value):
+    return datetime.time.fromisoformat(value) if value else None
+
+
+def snapshot_shifts(snapshot):
+    """
+    Zmiany z zapisu archiwum jako niezapisane obiekty Shift - szablony mogą je wyświetlać jak zwykłe zmiany.
+    """
+    return [
+        Shift(name=s['name'], shift_type=s['shift_type'], start_hour=_time(s['start_hour']),
+              end_hour=_time(s['end_hour']), capacity=s['capacity'])
+        for s in snapshot['shifts']
+    ]
+
+
+def snapshot_grid(snapshot):
+    """
+    Odtwarza z zapisu archiwum parę (shifts, data) w tym samym formacie co Schedule.get_grid().
+    """
+    shifts = snapshot_shifts(snapshot)
+    day = datetime.date.fromisoformat(snapshot['start_day'])
+    end_date = datetime.date.fromisoformat(snapshot['end_date'])
+
+    data = []
+    while day <= end_date:
+        columns = [[] for s in shifts]
+        for column, name, title, user_id, *ids in snapshot['slots'].get(day.isoformat(), []):
+            columns[column].append(Person(name=name, title=title, user_id=user_id) if name else '-------')
+        data.append([str(day.day), DAYS[day.isoweekday() - 1]] + [cell for column in columns for cell in column])
+        day += datetime.timedelta(days=1)
+
+    return shifts, data
+
+
+def snapshot_rows(snapshot):
+    """
+    Wiersze eksportu (jak schedule.exports.assignment_rows) odtworzone z zapisu archiwum.
+    """
+    titles = dict(Person._meta.get_field('title').choices)
+    shifts = snapshot['shifts']
+    for date, slots in sorted(snapshot['slots'].items()):
+        day = datetime.date.fromisoformat(date)
+        for column, name, title, *ids in sorted(slots, key=lambda slot: (shifts[slot[0]]['start_hour'] or '')):
+            shift = shifts[column]
+            hours = f'{shift["start_hour"][:5]}-{shift["end_hour"][:5]}' if shift['start_hour'] and shift['end_hour'] \
+                else ''
+            yield (snapshot['name'], date, DAYS[day.isoweekday() - 1], hours, shift['shift_type'], name or '',
+                   titles.get(title, title or ''))
+
+
+def snapshot_person_slots(snapshot, person_id):
+    """
+    Sloty osoby z zapisu jako krotki (id slotu, id zmiany, data, godzina rozpoczęcia, godzina zakończenia,
+    nazwa zmiany, nazwa terminarza) - w formacie wierszy kanału kalendarza (schedule.ical).
+    """
+    shifts = snapshot['shifts']
+    for date, slots in sorted(snapshot['slots'].items()):
+        # id osoby i slotu (ostatnie pola) nie występują w zapisach sprzed ich dodania
+        for column, name, title, user_id, *ids in slots:
+            if ids and ids[0] == person_id:
+                shift = shifts[column]
+                yield (ids[1], shift.get('id'), datetime.date.fromisoformat(date), _time(shift['start_hour']),
+                       _time(shift['end_hour']), shift['name'], snapshot['name'])
+
+
+def get_schedule_snapshot(schedule):
+    """
+    Zwraca parę (rodzaj, zapis) dla terminarza zarchiwizowanego ('archive') lub opublikowanego ('published')
+    albo (None, None) dla wersji roboczej. Wynik trzymany jest w cache do zmiany archiwum lub publikacji.
+    """
+    def builder():
+        current = Schedule.all_objects.select_related('archive', 'published').get(id=schedule.id)
+        if hasattr(current, 'archive'):
+            return 'archive', current.archive.get_snapshot()
+        if hasattr(current, 'published'):
+            return 'published', current.published.get_snapshot()
+        return None, None
+
+    # id terminarzy w różnych bazach aptek mogą się powtarzać
+    return cached('snapshots', f'id:{current_database()}:{schedule.id}', builder, scoped=False)
+
+
+def get_schedule_grid(schedule):
+    """
+    Zwraca (shifts, data) terminarza - z zapisu dla terminarzy zarchiwizowanych i opublikowanych,
+    w przeciwnym wypadku z bieżących slotów.
+    """
+    kind, snapshot = get_schedule_snapshot(schedule)
+    if snapshot is not None:
+        return snapshot_grid(snapshot)
+    return schedule.get_grid()
+
+
+def publish_schedule(schedule, user=None):
+    """
+    Publikuje terminarz (lub odświeża jego publikację) zapisując bieżącą tabelę w PublishedSchedule.
+    """
+    with transaction.atomic(using=router.db_for_write(PublishedSchedule)):
+        published, created = PublishedSchedule.objects.update_or_create(
+            schedule=schedule, defaults={'data': build_snapshot(schedule), 'published_by': user}
+        )
+    return published
+
+
+def unpublish_schedule(schedule):
+    PublishedSchedule.objects.filter(schedule=schedule).delete()
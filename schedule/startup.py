@@ -0,0 +1,93 @@
+"""
+Start procesów aplikacji - ładowanie ciężkich zależności oraz pomiary czasu importu.
+
+Moduły z HEAVY_MODULES nie są importowane przy starcie (importy wewnątrz funkcji, np. schedule.printing).
+warm_up() importuje je z góry, jeśli włączono PRELOAD_HEAVY_MODULES - wywoływane w wsgi/asgi, więc przy
+gunicorn --preload import odbywa się raz w procesie nadrzędnym, a procesy robocze dziedziczą załadowane moduły.
+
+Pomiary uruchamiane są w osobnych procesach interpretera, aby wynik nie zależał od modułów zaimportowanych
+już przez bieżący proces.
+"""
+from django.conf import settings
+from django.urls import get_resolver
+
+import ast
+import importlib
+import json
+import os
+import subprocess
+import sys
+
+HEAVY_MODULES = ('xhtml2pdf.pisa', 'pypdf')
+
+STARTUP_TARGET = 'PharmacySchedule.wsgi'
+
+# start procesu roboczego: import aplikacji oraz URLconf (z widokami), który Django ładuje przy pierwszym żądaniu
+_STARTUP_CODE = '''
+import {target}
+from django.urls import get_resolver
+get_resolver().url_patterns
+'''
+
+_MEASURE_CODE = '''
+import json, resource, sys, time
+started = time.perf_counter()
+{startup}
+elapsed = time.perf_counter() - started
+print(json.dumps({{'seconds': elapsed, 'maxrss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                  'modules': len(sys.modules)}}))
+'''
+
+
+def warm_up(force=False):
+    """
+    Ładuje URLconf (widoki) i importuje HEAVY_MODULES, jeśli włączono PRELOAD_HEAVY_MODULES (albo force=True).
+    Brak opcjonalnej zależności nie przerywa startu - zostanie zgłoszony przy pierwszym użyciu.
+    """
+    if not (force or getattr(settings, 'PRELOAD_HEAVY_MODULES', False)):
+        return []
+    get_resolver().url_patterns
+    loaded = []
+    for module in HEAVY_MODULES:
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            continue
+        loaded.append(module)
+    return loaded
+
+
+def _run(args, preload=False):
+    env = dict(os.environ, PRELOAD_HEAVY_MODULES='1' if preload else '')
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'PharmacySchedule.settings')
+    return subprocess.run([sys.executable, *args], env=env, cwd=settings.BASE_DIR, capture_output=True, text=True,
+                          check=True)
+
+
+def measure_startup(target=STARTUP_TARGET, preload=False):
+    """
+    Uruchamia aplikację (target i URLconf) w nowym procesie i zwraca słownik: seconds (czas startu),
+    maxrss_kb (szczytowe zużycie pamięci procesu) oraz modules (liczba załadowanych modułów).
+    """
+    code = _MEASURE_CODE.format(startup=_STARTUP_CODE.format(target=target))
+    return json.loads(_run(['-c', code], preload).stdout.strip().splitlines()[-1])
+
+
+def import_times(target=STARTUP_TARGET, preload=False):
+    """
+    Uruchamia aplikację (target i URLconf) w nowym procesie z -X importtime i zwraca parę: lista (moduł, czas
+    własny [us], czas łączny [us], czy import najwyższego poziomu) posortowana malejąco po czasie łącznym oraz
+    lista załadowanych modułów z HEAVY_MODULES (sprawdzana w sys.modules - część bibliotek podmienia
+    sys.stderr, przez co ich wpisy importtime mogą nie zostać wypisane).
+    """
+    code = _STARTUP_CODE.format(target=target) + \
+        f'import sys\nprint([m for m in {HEAVY_MODULES!r} if m in sys.modules])\n'
+    result = _run(['-X', 'importtime', '-c', code], preload)
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        times.append((module.strip(), int(self_us), int(cumulative_us), module[1:2] != ' '))
+    heavy = ast.literal_eval(result.stdout.strip().splitlines()[-1])
+    return sorted(times, key=lambda t: t[2], reverse=True), heavy
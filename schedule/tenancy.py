@@ -0,0 +1,141 @@
+"""
+Obsługa wielu aptek (tenantów).
+
+TenantMiddleware ustala aptekę bieżącego użytkownika (na podstawie przypisanej mu osoby), a TenantManager
+automatycznie ogranicza zapytania modeli Schedule, Shift i Person do tej apteki. Dane wszystkich aptek widzą
+tylko superużytkownicy oraz komendy zarządzające. Pozostali użytkownicy bez przypisanej apteki (oraz żądania
+bez logowania) dostają pusty zakres (NO_PHARMACY).
+
+TenantRouter kieruje dane apteki z ustawionym polem database do osobnej bazy danych. Baza taka musi mieć
+wykonane migracje; kopie wierszy aptek i kont użytkowników przypisanych do jej osób (cele kluczy obcych)
+zapisywane są w niej przy zapisie (copy_to_database). Transakcje obejmujące zapisy danych aptek
+otwierane są na bazie wskazanej przez router (transaction.atomic(using=router.db_for_write(...))), a komendy
+zarządzające działają na danych jednej apteki w bloku pharmacy_scope().
+"""
+from asgiref.local import Local
+from contextlib import contextmanager
+from django.db import DEFAULT_DB_ALIAS, models
+
+_state = Local()
+
+
+class _NoPharmacy:
+    """
+    Pusty zakres - zapytania modeli aptek nie zwracają żadnych wierszy.
+    """
+    id = None
+    database = DEFAULT_DB_ALIAS
+
+
+NO_PHARMACY = _NoPharmacy()
+
+
+def get_current_pharmacy():
+    """
+    Zwraca aptekę bieżącego żądania, NO_PHARMACY dla pustego zakresu albo None (dane wszystkich aptek).
+    """
+    return getattr(_state, 'pharmacy', None)
+
+
+def set_current_pharmacy(pharmacy):
+    _state.pharmacy = pharmacy
+
+
+@contextmanager
+def pharmacy_scope(pharmacy):
+    """
+    Ogranicza zapytania (i kieruje je do bazy apteki) na czas bloku - dla komend i zadań poza żądaniem.
+    """
+    previous = get_current_pharmacy()
+    set_current_pharmacy(pharmacy)
+    try:
+        yield
+    finally:
+        set_current_pharmacy(previous)
+
+
+def current_database():
+    """
+    Alias bazy danych apteki bieżącego żądania (bez replik) - np. do kluczy cache danych z tej bazy.
+    """
+    pharmacy = get_current_pharmacy()
+    return pharmacy.database if pharmacy is not None else DEFAULT_DB_ALIAS
+
+
+def copy_to_database(instance, database):
+    """
+    Zapisuje kopię wiersza z bazy domyślnej (apteki, konta użytkownika) w bazie apteki pod tym samym id.
+    """
+    model = type(instance)
+    fields = {field.attname: getattr(instance, field.attname)
+              for field in model._meta.concrete_fields if not field.primary_key}
+    model._base_manager.using(database).update_or_create(pk=instance.pk, defaults=fields)
+
+
+class TenantManager(models.Manager):
+    """
+    Manager ograniczający zapytania do apteki bieżącego żądania.
+    """
+    def get_queryset(self):
+        return scope_to_pharmacy(super().get_queryset())
+
+
+def scope_to_pharmacy(queryset, field='pharmacy'):
+    """
+    Ogranicza queryset do apteki bieżącego żądania. field - ścieżka do pola apteki, np. 'shift__pharmacy'.
+    """
+    pharmacy = get_current_pharmacy()
+    if pharmacy is NO_PHARMACY:
+        return queryset.none()
+    if pharmacy is not None:
+        queryset = queryset.filter(**{f'{field}_id': pharmacy.id})
+    return queryset
+
+
+def request_pharmacy(user):
+    """
+    Apteka, do której ograniczane są zapytania żądania użytkownika user.
+    """
+    from schedule.caching import user_pharmacy
+
+    if user.is_superuser:
+        return None
+    if not user.is_authenticated:
+        return NO_PHARMACY
+    return user_pharmacy(user) or NO_PHARMACY
+
+
+class TenantMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        set_current_pharmacy(request_pharmacy(request.user))
+        try:
+            return self.get_response(request)
+        finally:
+            set_current_pharmacy(None)
+
+
+class TenantRouter:
+    """
+    Kieruje modele aplikacji schedule (poza samą apteką) do bazy danych bieżącej apteki. Dla aptek w bazie
+    domyślnej nie podejmuje decyzji - przejmują ją kolejne routery (ReplicaRouter).
+    """
+    def _tenant_database(self, model):
+        if model._meta.app_label != 'schedule' or model._meta.model_name == 'pharmacy':
+            return None
+        database = current_database()
+        return database if database != DEFAULT_DB_ALIAS else None
+
+    def db_for_read(self, model, **hints):
+        return self._tenant_database(model)
+
+    def db_for_write(self, model, **hints):
+        return self._tenant_database(model)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if self._tenant_database(obj1._meta.model) or self._tenant_database(obj2._meta.model):
+            return True
+        return None
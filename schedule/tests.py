@@ -0,0 +1,470 @@
+import datetime
+import unittest
+
+from django.conf import settings
+from django.contrib.auth.models import Permission, User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from PharmacySchedule import routers
+from PharmacySchedule.compression import brotli, CompressionMiddleware, accepted_encodings
+from schedule.archiving import archive_schedule
+from schedule.caching import user_pharmacy
+from schedule.cloning import clone_schedule
+from schedule.deletion import delete_schedule
+from schedule.exports import assignment_rows, _merge_by_date
+from schedule.forms import ShiftForm, PersonForm
+from schedule.ical import build_feed
+from schedule.importing import import_persons
+from schedule.models import Pharmacy, Person, Schedule, Shift, Slot, Leave
+from schedule.snapshots import get_schedule_snapshot, publish_schedule
+from schedule.tenancy import pharmacy_scope, set_current_pharmacy
+
+
+class CrossTenantTest(TestCase):
+    """
+    Widoki i formularze nie mogą pokazywać ani przyjmować danych innej apteki.
+    """
+    # formularz osoby sprawdza konta przypisane do osób we wszystkich bazach aptek, a middleware replik
+    # sprawdza stan skonfigurowanych replik
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.pharmacy1 = Pharmacy.objects.create(name='Apteka 1')
+        self.pharmacy2 = Pharmacy.objects.create(name='Apteka 2')
+
+        self.user1 = User.objects.create_user('user1', password='pw')
+        self.user2 = User.objects.create_user('user2', password='pw')
+        self.user2.user_permissions.add(Permission.objects.get(codename='add_shift'))
+        Person.all_objects.create(pharmacy=self.pharmacy1, user=self.user1, name='Osoba 1', title='Magister')
+        Person.all_objects.create(pharmacy=self.pharmacy2, user=self.user2, name='Osoba 2', title='Magister')
+
+        self.schedule1 = Schedule.all_objects.create(pharmacy=self.pharmacy1, name='Luty 1',
+                                                     start_day=datetime.date(2025, 2, 1),
+                                                     end_date=datetime.date(2025, 2, 28))
+        self.schedule2 = Schedule.all_objects.create(pharmacy=self.pharmacy2, name='Luty 2',
+                                                     start_day=datetime.date(2025, 2, 1),
+                                                     end_date=datetime.date(2025, 2, 28))
+
+    def tearDown(self):
+        set_current_pharmacy(None)
+        cache.clear()
+
+    def test_form_querysets_follow_current_pharmacy(self):
+        set_current_pharmacy(self.pharmacy1)
+        self.assertEqual(list(ShiftForm().fields['schedule'].queryset), [self.schedule1])
+        self.assertNotIn(self.user2, PersonForm().fields['user'].queryset)
+
+        set_current_pharmacy(self.pharmacy2)
+        self.assertEqual(list(ShiftForm().fields['schedule'].queryset), [self.schedule2])
+        self.assertNotIn(self.user1, PersonForm().fields['user'].queryset)
+
+    def test_shift_add_rejects_schedule_of_other_pharmacy(self):
+        self.client.login(username='user2', password='pw')
+        data = {'name': 'A', 'shift_type': 'Main', 'start_hour': '08:00', 'end_hour': '16:00', 'capacity': 2}
+
+        response = self.client.get(reverse('shift-add'))
+        self.assertNotContains(response, 'Luty 1')
+
+        self.client.post(reverse('shift-add'), dict(data, schedule=self.schedule1.id))
+        self.assertFalse(Shift.all_objects.filter(schedule=self.schedule1).exists())
+
+        response = self.client.post(reverse('shift-add'), dict(data, schedule=self.schedule2.id))
+        self.assertRedirects(response, reverse('schedule-detail', kwargs={'schedule_id': self.schedule2.id}),
+                             fetch_redirect_response=False)
+        self.assertEqual(Shift.all_objects.get(schedule=self.schedule2).pharmacy, self.pharmacy2)
+
+    def test_only_superusers_see_all_pharmacies(self):
+        User.objects.create_superuser('admin', password='pw')
+        User.objects.create_user('bez_osoby', password='pw')
+        bez_apteki = User.objects.create_user('bez_apteki', password='pw')
+        Person.all_objects.create(user=bez_apteki, name='Osoba 3', title='Technik')
+        view_schedule = Permission.objects.get(codename='view_schedule')
+        for user in User.objects.filter(is_superuser=False):
+            user.user_permissions.add(view_schedule)
+
+        for username, visible in (('user2', ['Luty 2']), ('bez_osoby', []), ('bez_apteki', []),
+                                  ('admin', ['Luty 1', 'Luty 2'])):
+            self.client.login(username=username, password='pw')
+            response = self.client.get(reverse('schedule-list'))
+            self.assertEqual(sorted(s.name for s in response.context['schedules']), visible, username)
+
+    def test_import_requires_pharmacy(self):
+        lines = ['username,password,name,title', 'nowy,Xy7!kq93lm,Nowa osoba,Technik']
+
+        self.assertEqual(import_persons(lines, workers=1), (0, [(None, 'nie wybrano apteki importowanych osób')]))
+        self.assertEqual(import_persons(lines, workers=1, pharmacy=self.pharmacy1), (1, []))
+        self.assertEqual(Person.all_objects.get(name='Nowa osoba').pharmacy, self.pharmacy1)
+
+
+class PersonImportTest(TestCase):
+    """
+    Raport błędów importu osób dla plików, których nie da się odczytać albo które nie zawierają osób.
+    """
+    # middleware replik sprawdza stan skonfigurowanych replik
+    databases = '__all__'
+
+    def setUp(self):
+        User.objects.create_superuser('admin', password='pw')
+        self.client.login(username='admin', password='pw')
+
+    def test_file_errors_are_reported(self):
+        header = 'username,password,name,title\r\n'
+        files = (
+            ((header + 'nowy,Xy7!kq93lm,Żaneta Łódzka,Technik\r\n').encode('cp1250'),
+             'plik nie jest zapisany w kodowaniu UTF-8'),
+            (header.encode('utf-8'), 'plik nie zawiera wierszy z osobami'),
+        )
+        for content, message in files:
+            for dry_run in (False, True):
+                response = self.client.post(reverse('person-import'), {
+                    'file': SimpleUploadedFile('osoby.csv', content), 'dry_run': dry_run,
+                })
+                self.assertContains(response, message)
+                self.assertNotContains(response, 'Plik nie zawiera błędów')
+        self.assertFalse(Person.objects.exists())
+
+
+class FrozenScheduleTest(TestCase):
+    """
+    Terminarze zarchiwizowane i opublikowane - blokada zmian oraz kolejność wierszy eksportu.
+    """
+    # middleware replik sprawdza stan skonfigurowanych replik
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        User.objects.create_superuser('admin', password='pw')
+        self.client.login(username='admin', password='pw')
+
+        self.live = Schedule.objects.create(name='Roboczy', start_day=datetime.date(2025, 2, 1),
+                                            end_date=datetime.date(2025, 2, 4))
+        Shift.objects.create(schedule=self.live, name='A', capacity=1)
+        self.live.get_grid()
+        self.archived = Schedule.objects.create(name='Archiwum', start_day=datetime.date(2025, 1, 31),
+                                                end_date=datetime.date(2025, 2, 2))
+        Shift.objects.create(schedule=self.archived, name='B', capacity=1)
+        archive_schedule(self.archived)
+        self.published = Schedule.objects.create(name='Opublikowany', start_day=datetime.date(2025, 2, 3),
+                                                  end_date=datetime.date(2025, 2, 5))
+        self.published_shift = Shift.objects.create(schedule=self.published, name='C', capacity=1)
+        publish_schedule(self.published)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_shift_add_and_delete_skip_frozen_schedules(self):
+        data = {'name': 'D', 'shift_type': 'Main', 'start_hour': '08:00', 'end_hour': '16:00', 'capacity': 1}
+        for schedule in (self.archived, self.published):
+            self.client.post(reverse('shift-add'), dict(data, schedule=schedule.id))
+            self.assertFalse(Shift.all_objects.filter(schedule=schedule, name='D').exists())
+
+        self.client.get(reverse('shift-delete', kwargs={'shift_id': self.published_shift.id}))
+        self.assertTrue(Shift.objects.filter(id=self.published_shift.id).exists())
+
+    def test_archived_shifts_stay_in_calendar_feed(self):
+        person = Person.objects.create(name='Osoba', title='Magister')
+        schedule = Schedule.objects.create(name='Marzec', start_day=datetime.date(2025, 3, 1),
+                                           end_date=datetime.date(2025, 3, 2))
+        Shift.objects.create(schedule=schedule, name='E', start_hour=datetime.time(8), end_hour=datetime.time(16),
+                             capacity=1)
+        schedule.get_grid()
+        Slot.objects.filter(shift__schedule=schedule).update(person=person)
+
+        def events(feed):
+            return [line for line in feed.split('\r\n') if line.startswith(('UID', 'DTSTART', 'DESCRIPTION'))]
+
+        before = events(build_feed(person.id))
+        archive_schedule(schedule)
+        cache.clear()
+
+        self.assertFalse(Slot.objects.filter(shift__schedule=schedule).exists())
+        self.assertEqual(len(before), 2 * 3)
+        self.assertEqual(events(build_feed(person.id)), before)
+
+    def test_checkout_of_archived_schedule_redirects_to_detail(self):
+        response = self.client.get(reverse('schedule-checkout', kwargs={'schedule_id': self.archived.id}))
+        self.assertRedirects(response, reverse('schedule-detail', kwargs={'schedule_id': self.archived.id}),
+                             fetch_redirect_response=False)
+
+    def test_export_rows_are_ordered_by_date(self):
+        rows = list(assignment_rows())
+        self.assertEqual([row[1] for row in rows], sorted(row[1] for row in rows))
+        self.assertEqual({row[0] for row in rows}, {'Roboczy', 'Archiwum', 'Opublikowany'})
+        self.assertEqual(len(rows), 4 + 3 + 3)
+
+
+class MergeByDateTest(SimpleTestCase):
+    """
+    Scalanie wierszy slotów z wierszami zapisów terminarzy w eksporcie.
+    """
+    class Archive:
+        def __init__(self, opened, name, start_day, dates):
+            self.opened = opened
+            self.start_day = start_day
+            self.snapshot = {
+                'name': name,
+                'shifts': [{'id': 1, 'name': 'A', 'shift_type': 'Main', 'start_hour': '08:00:00',
+                            'end_hour': '16:00:00', 'capacity': 1}],
+                'slots': {date: [[0, 'Osoba', 'Magister', None]] for date in dates},
+            }
+
+        def get_snapshot(self):
+            self.opened.append(self.snapshot['name'])
+            return self.snapshot
+
+    class Archives(list):
+        def iterator(self):
+            return iter(self)
+
+    def test_rows_are_merged_in_date_order_and_snapshots_opened_lazily(self):
+        opened = []
+        january = self.Archive(opened, 'Styczeń', datetime.date(2025, 1, 31), ['2025-02-02', '2025-01-31'])
+        february = self.Archive(opened, 'Luty', datetime.date(2025, 2, 4), ['2025-02-06', '2025-02-04'])
+        rows = iter([('Roboczy', date) for date in ('2025-02-01', '2025-02-03', '2025-02-05')])
+
+        merged = _merge_by_date(rows, [self.Archives([february]), self.Archives([january])], None, None)
+        first = [next(merged) for num in range(4)]
+        self.assertEqual(opened, ['Styczeń'])
+
+        dates = [row[1] for row in first + list(merged)]
+        self.assertEqual(dates, sorted(dates))
+        self.assertEqual(len(dates), 7)
+        self.assertEqual(opened, ['Styczeń', 'Luty'])
+
+    def test_date_range_limits_snapshot_rows(self):
+        archive = self.Archive([], 'Styczeń', datetime.date(2025, 1, 31), ['2025-01-31', '2025-02-02'])
+        merged = _merge_by_date(iter([]), [self.Archives([archive])], datetime.date(2025, 2, 1), None)
+        self.assertEqual([row[1] for row in merged], ['2025-02-02'])
+
+
+class CloneScheduleTest(TestCase):
+    """
+    Powtarzanie wzoru przypisań terminarza źródłowego w cyklu rotation_days z przesunięciem offset.
+    """
+    def setUp(self):
+        # poniedziałek - środa, na każdy dzień inna osoba
+        self.source = Schedule.objects.create(name='Źródło', start_day=datetime.date(2025, 2, 3),
+                                              end_date=datetime.date(2025, 2, 5))
+        Shift.objects.create(schedule=self.source, name='A', capacity=1)
+        self.source.get_grid()
+        for num, slot in enumerate(Slot.objects.filter(shift__schedule=self.source).order_by('date')):
+            user = User.objects.create_user(f'user{num}')
+            slot.person = Person.objects.create(user=user, name=f'Osoba {num}', title='Magister')
+            slot.save()
+
+    def assigned(self, rotation_days, offset=0):
+        schedule = clone_schedule(self.source, 'Kopia', datetime.date(2025, 2, 10), datetime.date(2025, 2, 16),
+                                  copy_assignments=True, rotation_days=rotation_days, offset=offset)
+        slots = Slot.objects.filter(shift__schedule=schedule).order_by('date')
+        return [name[-1] if name else None for name in slots.values_list('person__name', flat=True)]
+
+    def test_rotation_continues_from_source_start_day(self):
+        # 10 lutego to 7. dzień od początku źródła - 7 % 3 = 1
+        self.assertEqual(self.assigned(3), ['1', '2', '0', '1', '2', '0', '1'])
+
+    def test_offset_shifts_pattern_including_negative_offsets(self):
+        self.assertEqual(self.assigned(3, offset=1), ['2', '0', '1', '2', '0', '1', '2'])
+        self.assertEqual(self.assigned(3, offset=-1), ['0', '1', '2', '0', '1', '2', '0'])
+        self.assertEqual(self.assigned(3, offset=-8), self.assigned(3, offset=1))
+
+    def test_days_of_rotation_missing_in_source_stay_empty(self):
+        # cykl tygodniowy, a źródło ma tylko trzy dni
+        self.assertEqual(self.assigned(7), ['0', '1', '2', None, None, None, None])
+        self.assertEqual(self.assigned(7, offset=-2), [None, None, '0', '1', '2', None, None])
+
+
+class SlotAvailabilityTest(TestCase):
+
+    def test_clean_rejects_person_on_leave(self):
+        person = Person.objects.create(name='Osoba', title='Magister')
+        Leave.objects.create(person=person, start_date=datetime.date(2025, 2, 5), end_date=datetime.date(2025, 2, 7))
+
+        with self.assertRaises(ValidationError) as error:
+            Slot(date=datetime.date(2025, 2, 6), person=person).full_clean()
+        self.assertIn('person', error.exception.message_dict)
+
+        Slot(date=datetime.date(2025, 2, 8), person=person).full_clean()
+
+
+class CompressionTest(SimpleTestCase):
+    """
+    Wybór metody kompresji z nagłówka Accept-Encoding i ETag skompresowanych odpowiedzi.
+    """
+    def request(self, accept_encoding):
+        return RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept_encoding)
+
+    def test_accepted_encodings_skip_q_zero(self):
+        self.assertEqual(accepted_encodings(self.request('gzip;q=0, br;q=0.000, deflate')), {'deflate'})
+        self.assertEqual(accepted_encodings(self.request('GZIP, br;q=0.001')), {'gzip', 'br'})
+
+    def compress(self, accept_encoding, etag, content_type='text/csv'):
+        def view(request):
+            response = HttpResponse('Luty;' * 1000, content_type=content_type)
+            response['ETag'] = etag
+            return response
+
+        return CompressionMiddleware(view)(self.request(accept_encoding))
+
+    def test_compressed_response_gets_weak_etag(self):
+        response = self.compress('gzip', '"abc"')
+        self.assertEqual((response['Content-Encoding'], response['ETag']), ('gzip', 'W/"abc"'))
+        self.assertEqual(self.compress('gzip', 'W/"abc"')['ETag'], 'W/"abc"')
+
+        response = self.compress('gzip;q=0', '"abc"')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response['ETag'], '"abc"')
+
+    @unittest.skipIf(brotli is None, 'wymaga pakietu Brotli')
+    def test_html_is_compressed_only_with_gzip(self):
+        self.assertEqual(self.compress('br, gzip', '"abc"')['Content-Encoding'], 'br')
+        self.assertEqual(self.compress('br, gzip', '"abc"', 'text/html')['Content-Encoding'], 'gzip')
+
+
+class ReplicaRouterTest(SimpleTestCase):
+    """
+    Przypinanie odczytów żądania do bazy głównej po zapisie.
+    """
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+        routers._state.replica = 'replica1'
+        routers._state.written = False
+
+    def tearDown(self):
+        routers._state.replica = None
+        routers._state.written = False
+
+    def test_write_pins_following_reads_to_primary(self):
+        self.assertEqual(self.router.db_for_read(Schedule), 'replica1')
+        self.assertEqual(self.router.db_for_write(Schedule), 'default')
+        self.assertEqual(self.router.db_for_read(Schedule), 'default')
+        self.assertTrue(routers._state.written)
+
+    def test_read_from_primary_does_not_pin_request(self):
+        with routers.read_from_primary():
+            self.assertEqual(self.router.db_for_read(Schedule), 'default')
+        self.assertEqual(self.router.db_for_read(Schedule), 'replica1')
+
+        with routers.read_from_primary():
+            self.router.db_for_write(Schedule)
+        self.assertEqual(self.router.db_for_read(Schedule), 'default')
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_middleware_sets_pin_cookie_after_write(self):
+        def write(request):
+            routers.pin_to_primary()
+            return HttpResponse()
+
+        request = RequestFactory().get('/')
+        self.assertIn(routers.PIN_COOKIE, routers.ReplicaRoutingMiddleware(write)(request).cookies)
+        response = routers.ReplicaRoutingMiddleware(lambda request: HttpResponse())(request)
+        self.assertNotIn(routers.PIN_COOKIE, response.cookies)
+        self.assertIsNone(routers._state.replica)
+
+
+# osobna testowa baza repliki (DATABASE_REPLICA_TEST_SEPARATE=1) - replika z TEST MIRROR to baza główna
+SEPARATE_REPLICA = 'replica1' in settings.DATABASES and not settings.DATABASES['replica1'].get('TEST', {}).get('MIRROR')
+
+
+@unittest.skipUnless(SEPARATE_REPLICA, 'wymaga osobnej bazy replica1 (DATABASE_REPLICA_TEST_SEPARATE=1)')
+class ReplicaFillSlotsTest(TransactionTestCase):
+    """
+    Uzupełnianie slotów przy odczytach kierowanych do repliki, która nie ma jeszcze slotów z bazy głównej.
+    TransactionTestCase - wewnątrz transakcji TestCase ReplicaRouter kieruje wszystkie odczyty do bazy głównej.
+    """
+    databases = {'default', 'replica1'} if SEPARATE_REPLICA else {'default'}
+
+    def tearDown(self):
+        routers._state.replica = None
+        routers._state.written = False
+        cache.clear()
+
+    def test_fill_slots_does_not_duplicate_slots_from_stale_replica(self):
+        schedule = Schedule.objects.create(name='Luty', start_day=datetime.date(2025, 2, 1),
+                                           end_date=datetime.date(2025, 2, 3))
+        shift = Shift.objects.create(schedule=schedule, name='A', capacity=2)
+        schedule.get_grid()
+        self.assertEqual(Slot.objects.using('default').count(), 6)
+
+        # replika z terminarzem i zmianą, ale jeszcze bez slotów
+        Schedule.all_objects.using('replica1').bulk_create([schedule])
+        Shift.all_objects.using('replica1').bulk_create([shift])
+
+        routers._state.replica = 'replica1'
+        routers._state.written = False
+        shifts, data = Schedule.objects.get(id=schedule.id).get_grid()
+
+        self.assertEqual(Slot.objects.using('default').count(), 6)
+        self.assertEqual([len(row) for row in data], [4, 4, 4])
+
+    def test_snapshot_cache_is_built_from_primary(self):
+        schedule = Schedule.objects.create(name='Styczeń', start_day=datetime.date(2025, 1, 1),
+                                           end_date=datetime.date(2025, 1, 2))
+        Shift.objects.create(schedule=schedule, name='A', capacity=1)
+        archive_schedule(schedule)
+
+        # replika bez archiwum - zapisany w cache wynik (None, None) odtworzyłby sloty terminarza
+        Schedule.all_objects.using('replica1').bulk_create([schedule])
+        routers._state.replica = 'replica1'
+        routers._state.written = False
+        kind, snapshot = get_schedule_snapshot(Schedule.objects.get(id=schedule.id))
+
+        self.assertEqual(kind, 'archive')
+        self.assertEqual(routers._state.replica, 'replica1')
+
+
+TENANT_DATABASE = next(iter(settings.TENANT_DATABASES), None)
+
+
+# osobna testowa baza repliki nie dostaje danych z bazy głównej - żądania czytają z bazy głównej
+@override_settings(REPLICA_DATABASES=[])
+@unittest.skipUnless(TENANT_DATABASE, 'wymaga osobnej bazy apteki (DATABASE_TENANT_URLS)')
+class TenantDatabaseTest(TransactionTestCase):
+    """
+    Apteka z osobną bazą danych - ustalanie apteki użytkownika, zapisy w transakcjach i eksport strumieniowy.
+    """
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.pharmacy = Pharmacy.objects.create(name='Apteka 2', database=TENANT_DATABASE)
+        user = User.objects.create_user('user2', password='pw')
+        user.user_permissions.add(Permission.objects.get(codename='view_schedule'))
+        with pharmacy_scope(self.pharmacy):
+            Person.objects.create(user=user, name='Osoba 2', title='Magister')
+            self.schedule = Schedule.objects.create(name='Luty 2', start_day=datetime.date(2025, 2, 1),
+                                                    end_date=datetime.date(2025, 2, 3))
+            Shift.objects.create(schedule=self.schedule, name='A', capacity=1)
+        self.client.login(username='user2', password='pw')
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_user_pharmacy_is_found_in_tenant_database(self):
+        self.assertFalse(Person.all_objects.using('default').exists())
+        self.assertEqual(user_pharmacy(User.objects.get(username='user2')), self.pharmacy)
+
+        response = self.client.get(reverse('schedule-list'))
+        self.assertEqual([s.name for s in response.context['schedules']], ['Luty 2'])
+
+    def test_slots_are_written_and_exported_from_tenant_database(self):
+        self.client.get(reverse('schedule-detail', kwargs={'schedule_id': self.schedule.id}))
+        self.assertEqual(Slot.objects.using(TENANT_DATABASE).count(), 3)
+        self.assertFalse(Slot.objects.using('default').exists())
+
+        response = self.client.get(reverse('schedule-export', kwargs={'schedule_id': self.schedule.id,
+                                                                      'export_format': 'csv'}))
+        self.assertEqual(b''.join(response.streaming_content).decode().count('Luty 2'), 3)
+
+        with pharmacy_scope(self.pharmacy):
+            delete_schedule(Schedule.objects.get(id=self.schedule.id))
+        self.assertFalse(Slot.objects.using(TENANT_DATABASE).exists())
+
+    def test_import_writes_persons_to_tenant_database(self):
+        lines = ['username,password,name,title', 'nowy,Xy7!kq93lm,Nowa osoba,Technik']
+        self.assertEqual(import_persons(lines, workers=1, pharmacy=self.pharmacy), (1, []))
+        self.assertEqual(Person.all_objects.using(TENANT_DATABASE).get(name='Nowa osoba').user.username, 'nowy')
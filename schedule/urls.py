@@ -1,17 +1,25 @@
 from django.urls import path
 from schedule.views import ScheduleDetailView, ScheduleEditView, LoginView, ScheduleListView, LogoutView, \
     ScheduleCheckoutView, ScheduleAdd, PersonAdd, GroupAdd, UserAdd, PersonListView, GroupListView, ShiftAddView, \
-    ShiftDeleteView, ScheduleDeleteView, UserDeleteView, PersonEditView, PrintPDFView
+    ShiftDeleteView, ScheduleDeleteView, UserDeleteView, PersonEditView, PrintPDFView, ScheduleExportView, \
+    PersonCalendarView, PrintBatchPDFView, ScheduleCloneView, PersonImportView, \
+    SchedulePublishView, ScheduleHistoryView, PersonHistoryView, LeaveListView, LeaveAddView, LeaveDeleteView, \
+    DatabaseMetricsView
 
 urlpatterns = [
     path('detail/<int:schedule_id>/', ScheduleDetailView.as_view(), name='schedule-detail'),
     path('edit/<int:schedule_id>/', ScheduleEditView.as_view(), name='schedule-edit'),
     path('checkout/<int:schedule_id>/', ScheduleCheckoutView.as_view(), name='schedule-checkout'),
+    path('publish/<int:schedule_id>/', SchedulePublishView.as_view(), name='schedule-publish'),
+    path('history/<int:schedule_id>/', ScheduleHistoryView.as_view(), name='schedule-history'),
+    path('person/history/<int:person_id>/', PersonHistoryView.as_view(), name='person-history'),
     path('login/', LoginView.as_view(), name='login'),
     path('all/', ScheduleListView.as_view(), name='schedule-list'),
     path('logout', LogoutView.as_view(), name='logout'),
     path('add/', ScheduleAdd.as_view(), name='schedule-add'),
+    path('clone/<int:schedule_id>/', ScheduleCloneView.as_view(), name='schedule-clone'),
     path('person/add/', PersonAdd.as_view(), name='person-add'),
+    path('person/import/', PersonImportView.as_view(), name='person-import'),
     path('person/all', PersonListView.as_view(), name='person-all'),
     path('group/add/', GroupAdd.as_view(), name='group-add'),
     path('user/add/', UserAdd.as_view(), name='user-add'),
@@ -21,5 +29,13 @@ urlpatterns = [
     path('delete/<int:schedule_id>/', ScheduleDeleteView.as_view(), name='schedule-delete'),
     path('user/delete/<int:user_id>/', UserDeleteView.as_view(), name='user-delete'),
     path('person/edit/<int:person_id>/', PersonEditView.as_view(), name='person-edit'),
-    path('print/<int:schedule_id>/', PrintPDFView.as_view(), name='print')
+    path('leave/all/', LeaveListView.as_view(), name='leave-all'),
+    path('leave/add/', LeaveAddView.as_view(), name='leave-add'),
+    path('leave/delete/<int:leave_id>/', LeaveDeleteView.as_view(), name='leave-delete'),
+    path('print/<int:schedule_id>/', PrintPDFView.as_view(), name='print'),
+    path('print/batch/', PrintBatchPDFView.as_view(), name='print-batch'),
+    path('export/<int:schedule_id>/<str:export_format>/', ScheduleExportView.as_view(), name='schedule-export'),
+    path('export/<str:export_format>/', ScheduleExportView.as_view(), name='schedules-export'),
+    path('calendar/<str:token>.ics', PersonCalendarView.as_view(), name='person-calendar'),
+    path('metrics/db/', DatabaseMetricsView.as_view(), name='db-metrics'),
 ]
@@ -1,16 +1,29 @@
-from django.shortcuts import render, HttpResponse, redirect
+from django.shortcuts import render, HttpResponse, redirect, get_object_or_404
+from django.http import JsonResponse, StreamingHttpResponse, Http404, HttpResponseBadRequest, HttpResponseNotModified
 from django.views import View
-from django.core.exceptions import ObjectDoesNotExist
+from django.core.exceptions import ObjectDoesNotExist, PermissionDenied
+from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
-from schedule.models import Schedule, Shift, Slot, Person
-from schedule.forms import ScheduleForm, PersonForm, GroupForm, UserForm, UserPersonForm, ShiftForm
+from schedule.models import Pharmacy, Schedule, Shift, Slot, Person, Leave, DAYS
+from schedule.forms import ScheduleForm, PersonForm, GroupForm, UserForm, UserPersonForm, ShiftForm, ExportRangeForm, \
+    ScheduleCloneForm, PersonImportForm, HistoryFilterForm, LeaveForm
+from schedule.exports import assignment_rows, EXPORT_FORMATS
+from schedule.ical import feed_token, person_from_token, get_feed
+from schedule.printing import render_schedule_html, render_pdf, render_batch, PDFRenderError
+from schedule.cloning import clone_schedule
+from schedule.deletion import delete_shifts, delete_schedule
+from schedule.importing import import_persons
+from schedule.snapshots import get_schedule_snapshot, get_schedule_grid, publish_schedule, unpublish_schedule
+from schedule.availability import candidates_by_day, find_conflicts
+from schedule.audit import schedule_history, person_history
+from schedule.caching import active_persons, all_persons, all_groups, all_schedules, get_schedule
+from schedule.tenancy import get_current_pharmacy, pharmacy_scope
 from django.contrib.auth import authenticate, login, logout, models
-from django.template.loader import get_template
+from django.urls import reverse
+from PharmacySchedule.dbpool import connection_metrics
 
 import datetime
-from xhtml2pdf import pisa
-
-DAYS = ('pn', 'wt', 'śr', 'cz', 'pt', 'sb', 'nd')
+import io
 
 
 class IndexView(LoginRequiredMixin, View):
@@ -21,6 +34,9 @@ class IndexView(LoginRequiredMixin, View):
     login_url = 'login'
 
     def get(self, request):
+        person = Person.objects.filter(user=request.user).first()
+        if person:
+            calendar_url = request.build_absolute_uri(reverse('person-calendar', args=[feed_token(person)]))
         return render(request, 'schedule/index.html', locals())
 
 
@@ -97,6 +113,31 @@ class ScheduleAdd(PermissionRequiredMixin, View):
         else:
             return redirect('schedule-list')
 
+class ScheduleCloneView(PermissionRequiredMixin, View):
+    """
+    Klonowanie terminarza.
+    Metoda GET - wyświetla formularz z nazwą i zakresem dat nowego terminarza oraz opcjami kopiowania przypisań.
+    Metoda POST - tworzy nowy terminarz ze zmianami terminarza o przekazanym id[schedule_id] i opcjonalnie
+    z jego wzorem przypisań, a następnie przenosi do edycji nowego terminarza.
+    """
+    permission_required = 'schedule.add_schedule'
+
+    def get(self, request, schedule_id):
+        schedule = get_object_or_404(Schedule, id=schedule_id)
+        form = ScheduleCloneForm(initial={'name': schedule.name})
+        return render(request, 'schedule/schedule-clone.html', locals())
+
+    def post(self, request, schedule_id):
+        schedule = get_object_or_404(Schedule, id=schedule_id)
+        form = ScheduleCloneForm(request.POST)
+
+        if form.is_valid():
+            new_schedule = clone_schedule(schedule, **form.cleaned_data)
+            return redirect('schedule-edit', schedule_id=new_schedule.id)
+        else:
+            return render(request, 'schedule/schedule-clone.html', locals())
+
+
 class ScheduleListView(PermissionRequiredMixin, View):
     """
     Wyświetlanie terminarzy.
@@ -108,7 +149,7 @@ class ScheduleListView(PermissionRequiredMixin, View):
     permission_required = 'schedule.view_schedule'
 
     def get(self, request):
-        schedules = Schedule.objects.all()
+        schedules = all_schedules()
         return render(request, 'schedule/schedule-list.html', locals())
 
 
@@ -122,56 +163,9 @@ class ScheduleDetailView(PermissionRequiredMixin, View):
     permission_required = 'schedule.view_schedule'
 
     def get(self, request, schedule_id):
-        schedule = Schedule.objects.get(id=schedule_id)
-        shifts = Shift.objects.filter(schedule=schedule).order_by('start_hour')
-
-        temp_shifts = []
-        main_shifts = []
-
-        for s in shifts:
-            if s.shift_type == 'Main':
-                main_shifts.append(s)
-            else:
-                temp_shifts.append(s)
-
-        for num in range(len(main_shifts)):
-            if num == 0:
-                temp_shifts.insert(num, main_shifts[num])
-            else:
-                temp_shifts.append(main_shifts[num])
-
-        shifts = temp_shifts
-
-        data = []
-
-        day = schedule.start_day
-        days = [day]
-
-        while day != schedule.end_date:
-            day += datetime.timedelta(days=1)
-            days.append(day)
-
-        for d in days:
-            for s in shifts:
-                slot_num = 0
-                for slot_shift in s.slots.all():
-                    if slot_shift.date == d:
-                        slot_num += 1
-                while slot_num < s.capacity:
-                    slot = Slot.objects.create(date=d)
-                    s.slots.add(slot)
-                    slot_num += 1
-
-        for d in days:
-            str_day = datetime.datetime.strftime(d, '%d')
-            if str_day[0] == '0':
-                str_day = str_day[1:]
-            row = [str_day, DAYS[datetime.datetime.isoweekday(d) - 1]]
-            for s in shifts:
-                for slot in s.slots.all():
-                    if slot.date == d:
-                        row.append(slot.person) if slot.person else row.append('-------')
-            data.append(row)
+        schedule = get_schedule(schedule_id)
+        shifts, data = get_schedule_grid(schedule)
+        snapshot_kind, snapshot = get_schedule_snapshot(schedule)
 
         return render(request, 'schedule/schedule-view.html', locals())
 
@@ -188,8 +182,11 @@ class ScheduleEditView(PermissionRequiredMixin, View):
     permission_required = 'schedule.change_schedule'
 
     def get(self, request, schedule_id):
-        persons = Person.objects.filter(user__isnull=False)
-        schedule = Schedule.objects.get(id=schedule_id)
+        schedule = get_schedule(schedule_id)
+        snapshot_kind, snapshot = get_schedule_snapshot(schedule)
+        if snapshot_kind == 'archive':
+            return redirect('schedule-detail', schedule_id=schedule.id)
+        persons = active_persons()
         shifts = Shift.objects.filter(schedule=schedule).order_by('start_hour')
 
         temp_shifts = []
@@ -218,6 +215,8 @@ class ScheduleEditView(PermissionRequiredMixin, View):
             day += datetime.timedelta(days=1)
             days.append(day)
 
+        candidates = candidates_by_day(persons, days)
+
         for d in days:
             str_day = datetime.datetime.strftime(d, '%d')
             if str_day[0] == '0':
@@ -226,23 +225,57 @@ class ScheduleEditView(PermissionRequiredMixin, View):
             for shift in shifts:
                 for slot in shift.slots.all().filter(date=d).order_by('id'):
                     row.append(slot)
-            shifts_data.append(row)
+            shifts_data.append((row, candidates[d]))
 
         return render(request, 'schedule/schedule-edit.html', locals())
 
     def post(self, request, schedule_id):
         schedule = Schedule.objects.get(id=schedule_id)
-        shifts = Shift.objects.filter(schedule=schedule).order_by('start_hour')
+        if get_schedule_snapshot(schedule)[0] == 'archive':
+            return redirect('schedule-detail', schedule_id=schedule.id)
+        person_ids = set(Person.objects.values_list('id', flat=True))
+
+        changed = []
+        for slot in Slot.objects.filter(shift__schedule=schedule):
+            slot_data = request.POST.get(f'slot_id{slot.id}')
+            if slot_data is None:
+                continue
+            person_id = int(slot_data) if slot_data != '---' else None
+            if person_id != slot.person_id and (person_id is None or person_id in person_ids):
+                slot.person_id = person_id
+                changed.append(slot)
+
+        conflicts = find_conflicts(changed)
+        for slot in changed:
+            if slot not in conflicts:
+                slot.save(update_fields=['person'])
+
+        if conflicts:
+            persons = {p.id: p for p in active_persons()}
+            for slot in conflicts:
+                messages.error(request, f'{slot.date} - {persons.get(slot.person_id, slot.person_id)} jest '
+                                        'nieobecny(a), przypisanie nie zostało zapisane')
+            return redirect('schedule-edit', schedule_id=schedule.id)
 
-        for shift in shifts:
-            for slot in shift.slots.all():
-                slot_data = request.POST.get(f'slot_id{slot.id}')
-                if slot_data != '---':
-                    slot.person = Person.objects.get(id=int(slot_data))
-                else:
-                    if slot.person:
-                        slot.person = None
-                slot.save()
+        return redirect('schedule-detail', schedule_id=schedule.id)
+
+
+class SchedulePublishView(PermissionRequiredMixin, View):
+    """
+    Publikacja terminarza.
+    Metoda POST - zapisuje bieżącą wersję terminarza jako opublikowaną (lub odświeża publikację). Z parametrem
+    unpublish publikacja jest wycofywana i terminarz ponownie wyświetlany jest z bieżących slotów.
+    """
+    permission_required = 'schedule.change_schedule'
+
+    def post(self, request, schedule_id):
+        schedule = get_object_or_404(Schedule, id=schedule_id)
+
+        if get_schedule_snapshot(schedule)[0] != 'archive':
+            if request.POST.get('unpublish'):
+                unpublish_schedule(schedule)
+            else:
+                publish_schedule(schedule, request.user)
 
         return redirect('schedule-detail', schedule_id=schedule.id)
 
@@ -251,12 +284,14 @@ class ScheduleCheckoutView(PermissionRequiredMixin, View):
     """
     Sprawdzenie poprawności stworzonego terminarza
     Po wejściu metodą GET zostaną wyświetlone informacje na temat ewentualnych ostrzeżeń dotyczących danego
-    terminarza.
+    terminarza. Terminarz zarchiwizowany nie ma już slotów - przekierowanie na widok terminarza.
     """
     permission_required = 'schedule.change_schedule'
 
     def get(self, request, schedule_id):
-        schedule = Schedule.objects.get(id=schedule_id)
+        schedule = get_schedule(schedule_id)
+        if get_schedule_snapshot(schedule)[0] == 'archive':
+            return redirect('schedule-detail', schedule_id=schedule.id)
         warrnings = schedule.check_correctness()
 
         return render(request, 'schedule/schedule-checkout.html', locals())
@@ -300,6 +335,31 @@ class PersonAdd(PermissionRequiredMixin, View):
             return render(request, 'schedule/person-add.html', locals())
 
 
+class PersonImportView(PermissionRequiredMixin, View):
+    """
+    Import osób z pliku CSV (kolumny: username, password, name, title, groups).
+    Metoda GET - wyświetla formularz z wyborem pliku.
+    Metoda POST - sprawdza wszystkie wiersze pliku i jeśli nie ma błędów tworzy użytkowników oraz osoby.
+    W przeciwnym wypadku wyświetla raport błędów dla poszczególnych wierszy.
+    """
+    permission_required = 'schedule.add_person'
+
+    def get(self, request):
+        form = PersonImportForm()
+        return render(request, 'schedule/person-import.html', locals())
+
+    def post(self, request):
+        form = PersonImportForm(request.POST, request.FILES)
+
+        if form.is_valid():
+            lines = io.TextIOWrapper(form.cleaned_data['file'], encoding='utf-8-sig', newline='')
+            created, errors = import_persons(lines, dry_run=form.cleaned_data['dry_run'],
+                                             pharmacy=form.cleaned_data.get('pharmacy'))
+            if created:
+                return redirect('person-all')
+        return render(request, 'schedule/person-import.html', locals())
+
+
 class PersonListView(PermissionRequiredMixin, View):
     """
     Widok po wejściu metodą GET wyświetla listę osób jeśli użytkownik posiada odpowiednie uprawnienia. W przeciwnym
@@ -308,7 +368,7 @@ class PersonListView(PermissionRequiredMixin, View):
     permission_required = 'schedule.add_person'
 
     def get(self, request):
-        persons = Person.objects.all()
+        persons = all_persons()
 
         return render(request, 'schedule/person-all.html', locals())
 
@@ -349,7 +409,7 @@ class GroupListView(PermissionRequiredMixin, View):
     permission_required = 'authenticate.add_group'
 
     def get(self, request):
-        groups = models.Group.objects.all()
+        groups = all_groups()
 
         return render(request, 'schedule/group-all.html', locals())
 
@@ -379,7 +439,8 @@ class ShiftAddView(PermissionRequiredMixin, View):
     Dodawanie zmian
     Metoda GET: wyświetlenie formularza do dodawania zmian. Jeśli przekażemy id terminarza zostanie on domyślnie
     wybrany w formularzu
-    Metoda POST: dodanie zmiany oraz przeniesienie na widok terminarza, do którego została dodana zmiana
+    Metoda POST: dodanie zmiany oraz przeniesienie na widok terminarza, do którego została dodana zmiana.
+    Terminarze zarchiwizowane i opublikowane nie są zmieniane.
     """
     permission_required = 'schedule.add_shift'
 
@@ -398,6 +459,8 @@ class ShiftAddView(PermissionRequiredMixin, View):
             data = form.cleaned_data
 
             schedule = data['schedule']
+            if get_schedule_snapshot(schedule)[0] is not None:
+                return redirect('schedule-detail', schedule_id=schedule.id)
             name = data['name']
             shift_type = data['shift_type']
             start_hour = data['start_hour']
@@ -417,16 +480,16 @@ class ShiftDeleteView(PermissionRequiredMixin, View):
 
     Jesli użytkownik posiada uprawnienie do usuwania zmian, widok usunie zmianą o przekazanym id zmiany[shift_id].
     Następnie następi przekierowanie do szczegółowego widoku terminarza, do którego zmiana była przypisana.
+    Zmiany terminarzy zarchiwizowanych i opublikowanych nie są usuwane.
     """
     permission_required = 'schedule.delete_shift'
 
     def get(self, request, shift_id):
         shift = Shift.objects.get(id=shift_id)
-        schedule_id = shift.schedule.id
-        slots = Slot.objects.filter(shift=shift)
-        for s in slots:
-            s.delete()
-        shift.delete()
+        schedule_id = shift.schedule_id
+        if get_schedule_snapshot(shift.schedule)[0] is not None:
+            return redirect('schedule-detail', schedule_id=schedule_id)
+        delete_shifts(Shift.objects.filter(id=shift.id))
         return redirect('schedule-detail', schedule_id=schedule_id)
 
 
@@ -439,10 +502,7 @@ class ScheduleDeleteView(PermissionRequiredMixin, View):
 
     def get(self, request, schedule_id):
         schedule = Schedule.objects.get(id=schedule_id)
-        shifts = Shift.objects.filter(schedule=schedule)
-        for s in shifts:
-            s.delete()
-        schedule.delete()
+        delete_schedule(schedule)
         return redirect('index')
 
 
@@ -489,74 +549,194 @@ class PersonEditView(PermissionRequiredMixin, View):
 class PrintPDFView(View):
 
     def get(self, request, schedule_id):
-        schedule = Schedule.objects.get(id=schedule_id)
-        font_url = "https://fonts.googleapis.com/css?family=Open+Sans:300,700"
-        # <----------
-        schedule = Schedule.objects.get(id=schedule_id)
-        shifts = Shift.objects.filter(schedule=schedule).order_by('start_hour')
+        schedule = get_schedule(schedule_id)
+        html = render_schedule_html(schedule, request)
 
-        temp_shifts = []
-        main_shifts = []
+        try:
+            pdf = render_pdf(html)
+        except PDFRenderError:
+            return HttpResponse('We had some errors <pre>' + html + '</pre>')
 
-        for s in shifts:
-            if s.shift_type == 'Main':
-                main_shifts.append(s)
-            else:
-                temp_shifts.append(s)
+        response = HttpResponse(pdf, content_type='application/pdf')
+        response['Content-Disposition'] = 'filename="report.pdf"'
+        return response
 
-        for num in range(len(main_shifts)):
-            if num == 0:
-                temp_shifts.insert(num, main_shifts[num])
-            else:
-                temp_shifts.append(main_shifts[num])
 
-        shifts = temp_shifts
+class PrintBatchPDFView(PermissionRequiredMixin, View):
+    """
+    Wydruk wielu terminarzy w jednym pliku PDF.
+    Metoda GET - terminarze wybierane są parametrem ?ids=1,2,3 albo zakresem dat ?start=RRRR-MM-DD&end=RRRR-MM-DD
+    (terminarze nachodzące na zakres). Poszczególne terminarze renderowane są równolegle.
+    """
+    permission_required = 'schedule.view_schedule'
 
-        data = []
+    def get(self, request):
+        if request.GET.get('ids'):
+            try:
+                ids = [int(i) for i in request.GET['ids'].split(',')]
+            except ValueError:
+                return HttpResponseBadRequest('Niepoprawna lista terminarzy')
+            schedules = Schedule.objects.filter(id__in=ids).order_by('start_day', 'id')
+        else:
+            form = ExportRangeForm(request.GET)
+            if not form.is_valid():
+                return HttpResponseBadRequest(form.errors.as_text())
+            schedules = Schedule.objects.filter(start_day__lte=form.cleaned_data['end'],
+                                                end_date__gte=form.cleaned_data['start']).order_by('start_day', 'id')
 
-        day = schedule.start_day
-        days = [day]
+        if not schedules:
+            raise Http404
 
-        while day != schedule.end_date:
-            day += datetime.timedelta(days=1)
-            days.append(day)
+        response = HttpResponse(content_type='application/pdf')
+        response['Content-Disposition'] = 'filename="schedules.pdf"'
+        try:
+            render_batch(schedules, response, request)
+        except PDFRenderError:
+            return HttpResponse('We had some errors', status=500)
+        return response
 
-        for d in days:
-            for s in shifts:
-                slot_num = 0
-                for slot_shift in s.slots.all():
-                    if slot_shift.date == d:
-                        slot_num += 1
-                while slot_num < s.capacity:
-                    slot = Slot.objects.create(date=d)
-                    s.slots.add(slot)
-                    slot_num += 1
 
-        for d in days:
-            str_day = datetime.datetime.strftime(d, '%d')
-            if str_day[0] == '0':
-                str_day = str_day[1:]
-            row = [str_day, DAYS[datetime.datetime.isoweekday(d) - 1]]
-            for s in shifts:
-                for slot in s.slots.all():
-                    if slot.date == d:
-                        row.append(slot.person) if slot.person else row.append('-------')
-            data.append(row)
-        # ------------>
-        html = None
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = f'filename="report.pdf"'
-        template_path = 'schedule/print.html'
-        context = locals()
-        template = get_template(template_path)
-        if not html:
-            html = template.render(context)
+class ScheduleExportView(PermissionRequiredMixin, View):
+    """
+    Eksport przypisań do pliku CSV lub XLSX.
+
+    Metoda GET z id terminarza[schedule_id] - eksportuje sloty jednego terminarza.
+    Metoda GET bez id terminarza - eksportuje sloty wszystkich terminarzy z zakresu dat przekazanego parametrami
+    ?start=RRRR-MM-DD&end=RRRR-MM-DD.
+    Plik jest wysyłany strumieniowo, wiersz po wierszu.
+    """
+    permission_required = 'schedule.view_schedule'
+
+    def get(self, request, export_format, schedule_id=None):
+        if export_format not in EXPORT_FORMATS:
+            raise Http404
+
+        if schedule_id is not None:
+            schedule = get_object_or_404(Schedule, id=schedule_id)
+            rows = assignment_rows(schedule=schedule)
+            filename = f'schedule-{schedule.id}.{export_format}'
         else:
-            html = html + template.render(context)
+            form = ExportRangeForm(request.GET)
+            if not form.is_valid():
+                return HttpResponseBadRequest(form.errors.as_text())
+            start = form.cleaned_data['start']
+            end = form.cleaned_data['end']
+            rows = assignment_rows(start=start, end=end)
+            filename = f'schedules-{start}-{end}.{export_format}'
+
+        stream, content_type = EXPORT_FORMATS[export_format]
+        response = StreamingHttpResponse(stream(rows), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
 
-        pisa_status = pisa.CreatePDF(
-            html, dest=response, encoding='UTF-8')
-        # if error
-        if pisa_status.err:
-            return HttpResponse('We had some errors <pre>' + html + '</pre>')
+
+class PersonCalendarView(View):
+    """
+    Kanał iCalendar z przypisaniami osoby do zmian we wszystkich terminarzach.
+    Dostęp odbywa się przez podpisany token[token] zamiast logowania, aby kalendarze w telefonach mogły go
+    odpytywać. Obsługiwany jest nagłówek If-None-Match - niezmieniony kanał zwraca kod 304.
+    """
+    def get(self, request, token):
+        owner = person_from_token(token)
+        if owner is None:
+            raise Http404
+        person_id, pharmacy_id = owner
+
+        # kanał osoby apteki z osobną bazą danych budowany jest z bazy tej apteki
+        pharmacy = Pharmacy.objects.filter(id=pharmacy_id).first() if pharmacy_id else None
+        with pharmacy_scope(pharmacy or get_current_pharmacy()):
+            etag, body = get_feed(person_id)
+        if etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(body, content_type='text/calendar; charset=utf-8')
+            response['Content-Disposition'] = 'inline; filename="schedule.ics"'
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
         return response
+
+
+class ScheduleHistoryView(PermissionRequiredMixin, View):
+    """
+    Historia zmian przypisań w terminarzu[schedule_id].
+    Metoda GET - wyświetla zmiany od najnowszych, opcjonalnie ograniczone parametrami ?start=&end=.
+    """
+    permission_required = 'schedule.change_schedule'
+
+    def get(self, request, schedule_id):
+        schedule = get_object_or_404(Schedule, id=schedule_id)
+        form = HistoryFilterForm(request.GET)
+        form.is_valid()
+        entries = schedule_history(schedule, form.cleaned_data.get('start'), form.cleaned_data.get('end'))[:500]
+        subject = schedule
+        return render(request, 'schedule/history.html', locals())
+
+
+class PersonHistoryView(PermissionRequiredMixin, View):
+    """
+    Historia zmian przypisań osoby[person_id] - zarówno przypisania, jak i usunięcia ze slotów.
+    Metoda GET - wyświetla zmiany od najnowszych, opcjonalnie ograniczone parametrami ?start=&end=.
+    """
+    permission_required = 'schedule.change_schedule'
+
+    def get(self, request, person_id):
+        person = get_object_or_404(Person, id=person_id)
+        form = HistoryFilterForm(request.GET)
+        form.is_valid()
+        entries = person_history(person, form.cleaned_data.get('start'), form.cleaned_data.get('end'))[:500]
+        subject = person
+        return render(request, 'schedule/history.html', locals())
+
+
+class LeaveListView(PermissionRequiredMixin, View):
+    """
+    Lista bieżących i przyszłych nieobecności osób.
+    """
+    permission_required = 'schedule.view_leave'
+
+    def get(self, request):
+        leaves = Leave.objects.filter(end_date__gte=datetime.date.today()).select_related('person').order_by(
+            'start_date', 'person__name'
+        )
+        return render(request, 'schedule/leave-all.html', locals())
+
+
+class LeaveAddView(PermissionRequiredMixin, View):
+    """
+    Dodawanie nieobecności osoby.
+    Metoda GET - wyświetla formularz.
+    Metoda POST - zapisuje nieobecność. Przypisania osoby do slotów w tym okresie są od tej pory zgłaszane
+    w sprawdzeniu terminarza (ScheduleCheckoutView).
+    """
+    permission_required = 'schedule.add_leave'
+
+    def get(self, request):
+        form = LeaveForm()
+        return render(request, 'schedule/leave-add.html', locals())
+
+    def post(self, request):
+        form = LeaveForm(request.POST)
+
+        if form.is_valid():
+            form.save()
+            return redirect('leave-all')
+        return render(request, 'schedule/leave-add.html', locals())
+
+
+class LeaveDeleteView(PermissionRequiredMixin, View):
+    permission_required = 'schedule.delete_leave'
+
+    def get(self, request, leave_id):
+        leave = get_object_or_404(Leave, id=leave_id)
+        leave.delete()
+        return redirect('leave-all')
+
+
+class DatabaseMetricsView(LoginRequiredMixin, View):
+    """
+    Metryki połączeń z bazą danych procesu roboczego, który obsłużył żądanie (JSON) - tylko dla administratora.
+    """
+    def get(self, request):
+        if not request.user.is_superuser:
+            raise PermissionDenied
+        return JsonResponse(connection_metrics())